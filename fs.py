@@ -5,6 +5,12 @@ from crc32 import crc32
 
 INODE_SIZE = 88  # Новый размер инода с B+ деревом экстентов: 12 байт заголовка + 36 байт записей = 48 байт, + 40 байт базовых полей = 88
 
+# Скомпилированные форматы структур, которые (де)сериализуются чаще всего
+_INODE_BASE = struct.Struct("<IIIIIIIIII")
+_EXTENT_HEADER = struct.Struct("<HHHH")
+_EXTENT_INDEX = struct.Struct("<IQ")
+_EXTENT_LEAF = struct.Struct("<IHHI")
+
 @attr.s(auto_attribs=True)
 class Extent:
     start_block: int
@@ -26,11 +32,11 @@ class ExtentHeader:
     depth: int         # глубина дерева (0 - лист)
 
     def pack(self) -> bytes:
-        return struct.pack("<HHHH", self.magic, self.entries_count, self.max_entries, self.depth)
+        return _EXTENT_HEADER.pack(self.magic, self.entries_count, self.max_entries, self.depth)
 
     @classmethod
     def unpack(cls, data: bytes) -> "ExtentHeader":
-        magic, entries_count, max_entries, depth = struct.unpack("<HHHH", data[:8])
+        magic, entries_count, max_entries, depth = _EXTENT_HEADER.unpack_from(data)
         return cls(magic, entries_count, max_entries, depth)
 
 @attr.s(auto_attribs=True)
@@ -40,11 +46,11 @@ class ExtentIndex:
     child_block: int    # физический номер блока дочернего узла
 
     def pack(self) -> bytes:
-        return struct.pack("<IQ", self.logical_block, self.child_block)
+        return _EXTENT_INDEX.pack(self.logical_block, self.child_block)
 
     @classmethod
     def unpack(cls, data: bytes) -> "ExtentIndex":
-        logical_block, child_block = struct.unpack("<IQ", data[:12])
+        logical_block, child_block = _EXTENT_INDEX.unpack_from(data)
         return cls(logical_block, child_block)
 
 @attr.s(auto_attribs=True)
@@ -57,11 +63,11 @@ class ExtentLeaf:
 
     def pack(self) -> bytes:
         # структура: logical_block(4) + block_count(2) + start_block_hi(2) + start_block_lo(4)
-        return struct.pack("<IHHI", self.logical_block, self.block_count, self.start_block_hi, self.start_block_lo)
+        return _EXTENT_LEAF.pack(self.logical_block, self.block_count, self.start_block_hi, self.start_block_lo)
 
     @classmethod
     def unpack(cls, data: bytes) -> "ExtentLeaf":
-        logical_block, block_count, start_block_hi, start_block_lo = struct.unpack("<IHHI", data[:12])
+        logical_block, block_count, start_block_hi, start_block_lo = _EXTENT_LEAF.unpack_from(data)
         return cls(logical_block, block_count, start_block_hi, start_block_lo)
 
     def get_start_block(self) -> int:
@@ -97,15 +103,14 @@ class Inode:
             self.mtime,
             self.flags,
         )
-        data = struct.pack("<IIIIIIIIII", *base_tuple)
+        data = _INODE_BASE.pack(*base_tuple)
         # Добавляем сырые 48 байт корня дерева экстентов
         return data + self.extent_root
 
     @classmethod
     def unpack(cls, data: bytes) -> "Inode":
-        # Распаковываем базовые поля
-        main_data = data[:40]
-        fields = struct.unpack("<IIIIIIIIII", main_data)
+        # Распаковываем базовые поля прямо из буфера, без промежуточного среза
+        fields = _INODE_BASE.unpack_from(data)
         # Сырые 48 байт корня дерева экстентов
         extent_root = data[40:88]
         return cls(*fields, extent_root)
@@ -1,8 +1,11 @@
+import errno
+import io
 import os
 import posixpath
 import struct
 import time
-from typing import Dict, Iterator, List, Optional, Tuple, Union
+from collections import OrderedDict
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
 from dataclasses import dataclass
 from fs import INODE_SIZE, Superblock, GroupDesc, Inode
 from fs import ExtentHeader, ExtentLeaf, ExtentIndex
@@ -19,6 +22,10 @@ EXTENT_ENTRY_SIZE = 12
 DIRENTRY_HEADER_SIZE = 12
 DIRENTRY_STATIC_SIZE = 14  # 12 bytes header + 1 file_type + 1 reserved
 INODE_EXTENT_ROOT_SIZE = 48
+MAX_NAME_LEN = 255  # Max directory entry name length in bytes (UTF-8)
+
+# Заголовок записи каталога: inode, длина записи, длина имени
+_DIRENTRY_HEADER = struct.Struct("<III")
 
 # File types
 S_IFMT   = 0o170000  # битовая маска для типа файла
@@ -38,6 +45,12 @@ O_RDWR = 0o2  # Read/write
 O_CREAT = 0o100  # Create if not exists
 O_TRUNC = 0o1000  # Truncate to zero length
 
+# Max cached names (including misses) per directory
+DENTRY_CACHE_DIR_LIMIT = 4096
+
+# Max packed inodes kept in the write-through inode cache (least recently used are evicted)
+INODE_CACHE_LIMIT = 4096
+
 # Extent tree constants
 MAX_LEAF_ENTRIES = (BLOCK_SIZE - 8) // 12  # Max entries in leaf nodes in blocks
 MAX_INDEX_ENTRIES = (BLOCK_SIZE - 8) // 12  # Max entries in index nodes in blocks
@@ -110,22 +123,33 @@ class DirEntry:
 class FileSystem:
     """Ext4-like filesystem implementation"""
 
-    def __init__(self, image_path: str):
+    def __init__(self, image_path: str, image_file: Optional[BinaryIO] = None):
         self.image_path = image_path
-        self.image_file = None
+        # Уже открытый образ (например, io.BytesIO в памяти) вместо файла по пути
+        self.image_file = image_file
         self.superblock = None
         self.group_descriptors = []
         self.open_files: Dict[int, FileDescriptor] = {}
         self.next_fd = 3  # Start from 3 (after stdin, stdout, stderr)
+        # Кэш записей каталогов: dir_inode_num -> {name: inode_num}
+        self._dentry_cache: Dict[int, Dict[str, int]] = {}
+        # Каталоги, чей кэш содержит все записи: промах в них означает отсутствие имени
+        self._dentry_complete: set = set()
+        # Первый логический блок каталога, где может найтись место под новую запись
+        self._dentry_free_hint: Dict[int, int] = {}
+        # Сквозной LRU-кэш упакованных инодов: inode_num -> bytes, не больше INODE_CACHE_LIMIT
+        # записей; очищается при закрытии образа
+        self._inode_cache: "OrderedDict[int, bytes]" = OrderedDict()
 
         self._load_filesystem()
 
     def _load_filesystem(self):
         """Load filesystem metadata"""
-        if not os.path.exists(self.image_path):
-            raise FileNotFoundError(f"Filesystem image {self.image_path} not found")
+        if self.image_file is None:
+            if not os.path.exists(self.image_path):
+                raise FileNotFoundError(f"Filesystem image {self.image_path} not found")
 
-        self.image_file = open(self.image_path, "r+b")
+            self.image_file = open(self.image_path, "r+b")
 
         # Load superblock
         self.image_file.seek(0)
@@ -191,23 +215,76 @@ class FileSystem:
 
     def _get_inode(self, inode_num: int) -> Inode:
         """Get inode by number"""
-        _, _, _, inode_offset = self._resolve_inode_location(inode_num)
+        inode_data = self._inode_cache.get(inode_num)
+        if inode_data is None:
+            _, _, _, inode_offset = self._resolve_inode_location(inode_num)
 
-        self.image_file.seek(inode_offset)
-        inode_data = self.image_file.read(INODE_SIZE)
+            self.image_file.seek(inode_offset)
+            inode_data = self.image_file.read(INODE_SIZE)
 
-        if len(inode_data) != INODE_SIZE:
-            raise ValueError(f"Could not read inode {inode_num}")
+            if len(inode_data) != INODE_SIZE:
+                raise ValueError(f"Could not read inode {inode_num}")
 
+            self._cache_inode(inode_num, inode_data)
+        else:
+            self._inode_cache.move_to_end(inode_num)
+
+        # Каждый вызов получает свой объект, кэш хранит только байты
         return Inode.unpack(inode_data)
 
+    def _cache_inode(self, inode_num: int, inode_data: bytes):
+        """Store packed inode as most recently used, evicting the oldest beyond INODE_CACHE_LIMIT"""
+        self._inode_cache[inode_num] = inode_data
+        self._inode_cache.move_to_end(inode_num)
+        if len(self._inode_cache) > INODE_CACHE_LIMIT:
+            self._inode_cache.popitem(last=False)
+
+    def _get_inodes_bulk(self, inode_nums: List[int]) -> List[Inode]:
+        """Get many inodes, reading each run of adjacent inode-table blocks once"""
+        # Результат собираем отдельно: большая пачка может вытеснить из кэша свои же иноды
+        found: Dict[int, bytes] = {}
+        for inode_num in set(inode_nums):
+            inode_data = self._inode_cache.get(inode_num)
+            if inode_data is not None:
+                found[inode_num] = inode_data
+        missing = sorted(
+            (self._resolve_inode_location(inode_num)[3], inode_num)
+            for inode_num in set(inode_nums) if inode_num not in found
+        )
+
+        # Склеиваем соседние блоки таблицы инодов в непрерывные диапазоны
+        runs: List[Tuple[int, int, List[Tuple[int, int]]]] = []
+        for inode_offset, inode_num in missing:
+            first = inode_offset // BLOCK_SIZE
+            last = (inode_offset + INODE_SIZE - 1) // BLOCK_SIZE
+            if runs and first <= runs[-1][1] + 1:
+                runs[-1] = (runs[-1][0], max(last, runs[-1][1]), runs[-1][2])
+            else:
+                runs.append((first, last, []))
+            runs[-1][2].append((inode_offset, inode_num))
+
+        for first, last, members in runs:
+            self.image_file.seek(first * BLOCK_SIZE)
+            data = self.image_file.read((last - first + 1) * BLOCK_SIZE)
+            for inode_offset, inode_num in members:
+                start = inode_offset - first * BLOCK_SIZE
+                inode_data = data[start:start + INODE_SIZE]
+                if len(inode_data) != INODE_SIZE:
+                    raise ValueError(f"Could not read inode {inode_num}")
+                found[inode_num] = inode_data
+                self._cache_inode(inode_num, inode_data)
+
+        return [Inode.unpack(found[inode_num]) for inode_num in inode_nums]
+
     def _write_inode(self, inode_num: int, inode: Inode):
         """Write inode to disk"""
         _, _, _, inode_offset = self._resolve_inode_location(inode_num)
 
+        inode_data = inode.pack()
         self.image_file.seek(inode_offset)
-        self.image_file.write(inode.pack())
+        self.image_file.write(inode_data)
         self.image_file.flush()
+        self._cache_inode(inode_num, inode_data)
 
     def _write_superblock(self):
         self.image_file.seek(0)
@@ -220,6 +297,14 @@ class FileSystem:
         self.image_file.write(data)
         self.image_file.flush()
 
+    def _prefetch_blocks(self, block_nums):
+        """Hint the OS to read the given image blocks ahead of use"""
+        if not hasattr(os, "posix_fadvise") or isinstance(self.image_file, io.BytesIO):
+            return
+        fileno = self.image_file.fileno()
+        for block_num in block_nums:
+            os.posix_fadvise(fileno, block_num * BLOCK_SIZE, BLOCK_SIZE, os.POSIX_FADV_WILLNEED)
+
     def _find_and_set_free_bit(self, bitmap: bytearray) -> Optional[int]:
         """Finds the first free bit in a bitmap, sets it, and returns its index."""
         for byte_idx in range(len(bitmap)):
@@ -265,34 +350,56 @@ class FileSystem:
 
     def _allocate_inode(self) -> int:
         """Allocate a new inode"""
+        return self._allocate_inodes(1)[0]
+
+    def _allocate_inodes(self, count: int) -> List[int]:
+        """Allocate count inodes, reading and writing each group's bitmap once"""
+        if count > self.superblock.free_inodes_count:
+            raise OSError("No free inodes available")
+
+        inode_nums: List[int] = []
         for group_num, group_desc in enumerate(self.group_descriptors):
+            if len(inode_nums) == count:
+                break
             if group_desc.free_inodes_count > 0:
                 # Read inode bitmap
                 self.image_file.seek(group_desc.inode_bitmap_block * BLOCK_SIZE)
                 bitmap = bytearray(self.image_file.read(BLOCK_SIZE))
 
-                # Find free inode
-                bit_offset = self._find_and_set_free_bit(bitmap)
-                if bit_offset is not None:
+                # Забираем из группы столько свободных инодов, сколько в ней есть
+                taken = 0
+                while len(inode_nums) < count and taken < group_desc.free_inodes_count:
+                    bit_offset = self._find_and_set_free_bit(bitmap)
+                    if bit_offset is None:
+                        break
+                    inode_nums.append(group_num * INODES_PER_GROUP + bit_offset + 1)
+                    taken += 1
+
+                if taken:
                     # Write bitmap back
                     self.image_file.seek(group_desc.inode_bitmap_block * BLOCK_SIZE)
                     self.image_file.write(bitmap)
 
                     # Update group descriptor
-                    group_desc.free_inodes_count -= 1
+                    group_desc.free_inodes_count -= taken
                     self.group_descriptors[group_num] = group_desc  # Update in-memory copy
                     self._write_group_descriptor(group_num, group_desc)
 
-                    # Update superblock
-                    self.superblock.free_inodes_count -= 1
-                    self._write_superblock()
+        if inode_nums:
+            # Update superblock
+            self.superblock.free_inodes_count -= len(inode_nums)
+            self._write_superblock()
 
-                    return group_num * INODES_PER_GROUP + bit_offset + 1
+        if len(inode_nums) < count:
+            raise OSError("No free inodes available")
 
-        raise OSError("No free inodes available")
+        return inode_nums
 
     def _allocate_block(self) -> int:
         """Allocate a new block"""
+        if self.superblock.free_blocks_count <= 0:
+            raise OSError("No free blocks available")
+
         for group_num, group_desc in enumerate(self.group_descriptors):
             if group_desc.free_blocks_count > 0:
                 # Read block bitmap
@@ -330,50 +437,66 @@ class FileSystem:
 
     def _free_block(self, block_num: int):
         """Free a block"""
-        # Prevent freeing metadata blocks
-        if block_num == 0:
-            return  # Superblock
-        if block_num == 1:
-            return  # Group descriptors
-        
-        group_num = block_num // BLOCKS_PER_GROUP
-        block_idx = block_num % BLOCKS_PER_GROUP
-
-        if group_num >= len(self.group_descriptors):
-            return
-
-        group_desc = self.group_descriptors[group_num]
+        self._free_block_runs([(block_num, 1)])
+
+    def _metadata_block_mask(self, group_num: int, group_desc: GroupDesc) -> int:
+        """Bitmap mask of the group's blocks that must never be freed"""
+        inode_table_blocks = (INODES_PER_GROUP * INODE_SIZE + BLOCK_SIZE - 1) // BLOCK_SIZE
+        mask = 0
+        # Суперблок и дескрипторы групп, битовые карты, таблица инодов
+        for block in (0, 1, group_desc.block_bitmap_block, group_desc.inode_bitmap_block):
+            if block // BLOCKS_PER_GROUP == group_num:
+                mask |= 1 << (block % BLOCKS_PER_GROUP)
+        if group_desc.inode_table_block // BLOCKS_PER_GROUP == group_num:
+            mask |= ((1 << inode_table_blocks) - 1) << (group_desc.inode_table_block % BLOCKS_PER_GROUP)
+        return mask
+
+    def _free_block_runs(self, runs: List[Tuple[int, int]]):
+        """
+        Free runs of (start_block, block_count), reading and writing each group's
+        block bitmap once. The bitmap is handled as one integer, so a whole run is
+        cleared with a single mask instead of bit by bit.
+        """
+        # Маска освобождаемых битов для каждой затронутой группы
+        group_masks: Dict[int, int] = {}
+        for start_block, block_count in runs:
+            while block_count > 0:
+                group_num = start_block // BLOCKS_PER_GROUP
+                block_idx = start_block % BLOCKS_PER_GROUP
+                count = min(block_count, BLOCKS_PER_GROUP - block_idx)
+                if group_num < len(self.group_descriptors):
+                    group_masks[group_num] = group_masks.get(group_num, 0) | (((1 << count) - 1) << block_idx)
+                start_block += count
+                block_count -= count
 
-        # Check if this is a metadata block
-        if block_num == group_desc.block_bitmap_block:
-            return  # Block bitmap
-        if block_num == group_desc.inode_bitmap_block:
-            return  # Inode bitmap
-        if group_desc.inode_table_block <= block_num < group_desc.inode_table_block + (INODES_PER_GROUP * INODE_SIZE + BLOCK_SIZE - 1) // BLOCK_SIZE:
-            return  # Inode table
+        freed_total = 0
+        for group_num, mask in sorted(group_masks.items()):
+            group_desc = self.group_descriptors[group_num]
+            mask &= ~self._metadata_block_mask(group_num, group_desc)
 
-        # Read block bitmap
-        self.image_file.seek(group_desc.block_bitmap_block * BLOCK_SIZE)
-        bitmap = bytearray(self.image_file.read(BLOCK_SIZE))
+            # Read block bitmap
+            self.image_file.seek(group_desc.block_bitmap_block * BLOCK_SIZE)
+            bitmap = int.from_bytes(self.image_file.read(BLOCK_SIZE), "little")
 
-        # Clear block bit
-        byte_idx = block_idx // 8
-        bit_idx = block_idx % 8
-        # Only clear if set and update counters
-        if bitmap[byte_idx] & (1 << bit_idx):
-            bitmap[byte_idx] &= ~(1 << bit_idx)
+            # Only clear bits that are set and update counters by their number
+            cleared = bitmap & mask
+            if not cleared:
+                continue
 
             # Write bitmap back
             self.image_file.seek(group_desc.block_bitmap_block * BLOCK_SIZE)
-            self.image_file.write(bitmap)
+            self.image_file.write((bitmap ^ cleared).to_bytes(BLOCK_SIZE, "little"))
 
             # Update group descriptor
-            group_desc.free_blocks_count += 1
+            freed = cleared.bit_count()
+            group_desc.free_blocks_count += freed
             self.group_descriptors[group_num] = group_desc  # Update in-memory copy
             self._write_group_descriptor(group_num, group_desc)
+            freed_total += freed
 
+        if freed_total:
             # Update superblock
-            self.superblock.free_blocks_count += 1
+            self.superblock.free_blocks_count += freed_total
             self._write_superblock()
 
     def _allocate_block_at(self, block_num: int):
@@ -448,9 +571,9 @@ class FileSystem:
                 leaf_data = entries_data[i*EXTENT_ENTRY_SIZE:(i+1)*EXTENT_ENTRY_SIZE]
                 leaf = ExtentLeaf.unpack(leaf_data)
                 if leaf.logical_block == old_leaf.logical_block and leaf.get_start_block() == old_leaf.get_start_block():
-                    # Found the leaf, update it
+                    # Found the leaf, update it (node keeps its size: 48 bytes in inode, BLOCK_SIZE on disk)
                     new_entries = entries_data[:i*EXTENT_ENTRY_SIZE] + new_leaf.pack() + entries_data[(i+1)*EXTENT_ENTRY_SIZE:]
-                    return header.pack() + new_entries + b'\x00' * (BLOCK_SIZE - len(header.pack()) - len(new_entries))
+                    return header.pack() + new_entries
             return node_data  # Not found
         else:  # Index node
             for i in range(header.entries_count):
@@ -467,31 +590,63 @@ class FileSystem:
                     return node_data  # No change to this node
             return node_data
 
-    def _find_file_in_directory(self, dir_inode: Inode, filename: str) -> Optional[int]:
-        """Find file in directory, return inode number"""
-        for entry, _, _ in self._traverse_directory(dir_inode):
-            if entry and entry.name == filename:
-                return entry.inode_num
-        return None
+    def _lookup_dentry(self, dir_inode_num: int, dir_inode: Inode, filename: str) -> Optional[int]:
+        """
+        Find file in directory through the dentry cache, scanning the directory on a miss.
+        The first miss loads the whole directory, later misses need no scan; in directories
+        too large for the cache missing names are cached as inode 0 instead.
+        """
+        dir_cache = self._dentry_cache.setdefault(dir_inode_num, {})
+        inode_num = dir_cache.get(filename)
+        if inode_num is None:
+            if dir_inode_num in self._dentry_complete:
+                return None
+            entries = {entry.name: entry.inode_num for entry, _, _ in self._traverse_directory(dir_inode) if entry}
+            if len(entries) <= DENTRY_CACHE_DIR_LIMIT:
+                dir_cache.clear()
+                dir_cache.update(entries)
+                self._dentry_complete.add(dir_inode_num)
+                return entries.get(filename)
+            inode_num = entries.get(filename)
+            if len(dir_cache) >= DENTRY_CACHE_DIR_LIMIT:
+                dir_cache.clear()  # Не даём промахам раздувать кэш каталога
+            dir_cache[filename] = inode_num or 0
+        return inode_num or None
 
     def _add_directory_entry(
         self, dir_inode_num: int, filename: str, file_inode_num: int, file_type: int = 0
     ):
         """Add entry to directory"""
+        self._add_directory_entries(dir_inode_num, [(filename, file_inode_num, file_type)])
+
+    def _add_directory_entries(self, dir_inode_num: int, entries: List[Tuple[str, int, int]]):
+        """
+        Add (name, inode_num, file_type) entries to a directory in one pass.
+        Each directory block is read and written at most once, the inode is written once.
+        """
         dir_inode = self._get_inode(dir_inode_num)
 
         if not ((dir_inode.mode & S_IFMT) == S_IFDIR):
             raise OSError("Not a directory")
 
-        # Create new directory entry
-        new_entry = DirEntry(file_inode_num, len(filename.encode('utf-8')), filename, file_type)
-        entry_data = new_entry.pack()
-
-        # Ищем место в существующих блоках директории
+        dir_cache = self._dentry_cache.get(dir_inode_num, {})
+        # Пока записи не добавлены, кэш каталога не считается полным
+        complete = dir_inode_num in self._dentry_complete
+        self._dentry_complete.discard(dir_inode_num)
+        pending = []
+        for filename, file_inode_num, file_type in entries:
+            dir_cache.pop(filename, None)
+            # Create new directory entry
+            new_entry = DirEntry(file_inode_num, len(filename.encode('utf-8')), filename, file_type)
+            pending.append(new_entry.pack())
+        next_pending = 0
+
+        # Ищем место в существующих блоках директории, начиная с подсказки
         file_size = dir_inode.size_lo | (dir_inode.size_high << 32)
-        bytes_scanned = 0
+        bytes_scanned = self._dentry_free_hint.get(dir_inode_num, 0) * BLOCK_SIZE
+        hint_block = None
 
-        while bytes_scanned < file_size:
+        while bytes_scanned < file_size and next_pending < len(pending):
             logical_block = bytes_scanned // BLOCK_SIZE
             leaf = self._find_extent(dir_inode, logical_block)
             if leaf is None:
@@ -502,76 +657,125 @@ class FileSystem:
 
             self.image_file.seek(physical_block * BLOCK_SIZE)
             block_data = bytearray(self.image_file.read(BLOCK_SIZE))
+            modified = False
 
             # Ищем свободное место в блоке
             offset = 0
-            while offset < len(block_data):
+            while offset < len(block_data) and next_pending < len(pending):
                 try:
-                    result = DirEntry.unpack(bytes(block_data[offset:]), 0)
-                    if result[0] is None:  # Empty entry
-                        old_entry_len = result[1]
+                    # Для поиска места нужен только заголовок: имя не декодируем
+                    if offset + DIRENTRY_HEADER_SIZE > len(block_data):
+                        is_empty, entry_len = True, len(block_data) - offset
+                    else:
+                        entry_inode, entry_len, name_len = _DIRENTRY_HEADER.unpack_from(block_data, offset)
+                        is_empty = entry_inode == 0 or entry_len == 0 or name_len == 0
+                        if is_empty:
+                            entry_len = max(entry_len, len(block_data) - offset)
+                        elif offset + entry_len > len(block_data):
+                            raise ValueError("Directory entry length exceeds data")
+                    if is_empty:  # Empty entry
+                        old_entry_len = entry_len
+                        entry_data = pending[next_pending]
                         new_entry_len = len(entry_data)
-                        
+
                         if old_entry_len >= new_entry_len:
                             remaining_space = old_entry_len - new_entry_len
-                            
+                            next_pending += 1
+                            modified = True
+                            hint_block = logical_block
+
                             # If remaining space is enough for a new empty entry (at least DIRENTRY_HEADER_SIZE bytes for header)
                             if remaining_space >= DIRENTRY_HEADER_SIZE:
                                 # Split the slot: use part for new entry, create new empty slot for remainder
                                 block_data[offset:offset + new_entry_len] = entry_data
-                                
+
                                 # Create new empty entry in the remaining space
                                 empty_entry_header = struct.pack("<III", 0, remaining_space, 0)
                                 block_data[offset + new_entry_len:offset + new_entry_len + DIRENTRY_HEADER_SIZE] = empty_entry_header
+                                # Остаток слота может принять следующую запись
+                                entry_len = new_entry_len
                             else:
                                 # Not enough space to split, use entire slot
                                 block_data[offset:offset + old_entry_len] = entry_data
                                 # Update entry_len in the packed data to match the full slot size
                                 # This is crucial to ensure the next entry is found correctly.
                                 struct.pack_into("<I", block_data, offset + 4, old_entry_len)
-                            
-                            self.image_file.seek(physical_block * BLOCK_SIZE)
-                            self.image_file.write(block_data)
-                            self.image_file.flush()
-                            return
-                    else:
-                        entry_len = result[1]
                     offset += entry_len
                     if entry_len == 0:
                         break
                 except (ValueError, UnicodeDecodeError):
                     break
 
+            if modified:
+                self.image_file.seek(physical_block * BLOCK_SIZE)
+                self.image_file.write(block_data)
+
             bytes_scanned += BLOCK_SIZE
 
-        # Если не нашли место, выделяем новый блок
-        new_block = self._allocate_block()
-
-        # Добавляем новый экстент в дерево
-        dir_inode = self._insert_extent(dir_inode, ExtentLeaf(
-            logical_block=file_size // BLOCK_SIZE,
-            block_count=1,
-            start_block_hi=(new_block >> 32),
-            start_block_lo=(new_block & 0xFFFFFFFF)
-        ))
-
-        # Записываем новую запись в новый блок
-        self.image_file.seek(new_block * BLOCK_SIZE)
-        self.image_file.write(entry_data)
-        remaining = BLOCK_SIZE - len(entry_data)
-        self.image_file.write(b"\x00" * remaining)
-        self.image_file.flush()
+        # Оставшиеся записи упаковываем подряд в новые блоки
+        grew = False
+        try:
+            while next_pending < len(pending):
+                new_block = self._allocate_block()
 
-        # Обновляем размер директории
-        new_size = file_size + BLOCK_SIZE
-        dir_inode.size_lo = new_size & 0xFFFFFFFF
-        dir_inode.size_high = new_size >> 32
-        self._write_inode(dir_inode_num, dir_inode)
+                # Добавляем новый экстент в дерево
+                try:
+                    dir_inode = self._insert_extent(dir_inode, ExtentLeaf(
+                        logical_block=file_size // BLOCK_SIZE,
+                        block_count=1,
+                        start_block_hi=(new_block >> 32),
+                        start_block_lo=(new_block & 0xFFFFFFFF)
+                    ))
+                except OSError:
+                    self._free_block(new_block)
+                    raise
+
+                hint_block = file_size // BLOCK_SIZE
+                block_data = bytearray(BLOCK_SIZE)
+                offset = 0
+                while next_pending < len(pending) and offset + len(pending[next_pending]) <= BLOCK_SIZE:
+                    entry_data = pending[next_pending]
+                    block_data[offset:offset + len(entry_data)] = entry_data
+                    offset += len(entry_data)
+                    next_pending += 1
+
+                # Записываем новые записи в новый блок
+                self.image_file.seek(new_block * BLOCK_SIZE)
+                self.image_file.write(block_data)
+
+                file_size += BLOCK_SIZE
+                grew = True
+        finally:
+            self.image_file.flush()
+
+            if grew:
+                # Обновляем размер директории, даже если место кончилось посередине:
+                # уже записанные блоки должны остаться видимыми
+                dir_inode.size_lo = file_size & 0xFFFFFFFF
+                dir_inode.size_high = file_size >> 32
+                self._write_inode(dir_inode_num, dir_inode)
+
+        if hint_block is not None:
+            self._dentry_free_hint[dir_inode_num] = hint_block
+        if complete and len(dir_cache) + len(entries) <= DENTRY_CACHE_DIR_LIMIT:
+            for filename, file_inode_num, _ in entries:
+                dir_cache[filename] = file_inode_num
+            self._dentry_complete.add(dir_inode_num)
 
     def _free_inode_blocks(self, inode: Inode):
         """Free all blocks allocated to an inode"""
-        def free_node_blocks(node_data: bytes):
-            """Рекурсивно освобождает блоки из узла дерева"""
+        self._free_block_runs(self._collect_block_runs(inode))
+
+        # Сбрасываем дерево экстентов
+        header = ExtentHeader(magic=0xF30A, entries_count=0, max_entries=3, depth=0)
+        inode.extent_root = header.pack() + b'\x00' * 40
+
+    def _collect_block_runs(self, inode: Inode) -> List[Tuple[int, int]]:
+        """Return (start_block, block_count) runs of the inode's data and extent tree blocks"""
+        runs: List[Tuple[int, int]] = []
+
+        def collect_node_blocks(node_data: bytes):
+            """Рекурсивно собирает блоки из узла дерева"""
             if len(node_data) < 8:
                 return
             header = ExtentHeader.unpack(node_data[:8])
@@ -586,74 +790,92 @@ class FileSystem:
                         break
                     leaf_data = entries_data[i*EXTENT_ENTRY_SIZE : (i+1)*EXTENT_ENTRY_SIZE]
                     leaf = ExtentLeaf.unpack(leaf_data)
-                    # Освобождаем все блоки в экстенте
-                    for block_offset in range(leaf.block_count):
-                        block_num = leaf.get_start_block() + block_offset
-                        # Skip reserved blocks (0-1 in group 0)
-                        group_num = block_num // BLOCKS_PER_GROUP
-                        if not (group_num == 0 and block_num < 2):
-                            self._free_block(block_num)
+                    # Все блоки экстента - один отрезок
+                    if leaf.block_count:
+                        runs.append((leaf.get_start_block(), leaf.block_count))
             else:  # Индексный узел
                 for i in range(header.entries_count):
                     if i * EXTENT_ENTRY_SIZE + EXTENT_ENTRY_SIZE > len(entries_data):
                         break
                     idx_data = entries_data[i*EXTENT_ENTRY_SIZE : (i+1)*EXTENT_ENTRY_SIZE]
                     idx = ExtentIndex.unpack(idx_data)
-                    # Рекурсивно освобождаем дочерний узел
+                    # Рекурсивно обходим дочерний узел
                     self.image_file.seek(idx.child_block * BLOCK_SIZE)
                     child_data = self.image_file.read(BLOCK_SIZE)
-                    free_node_blocks(child_data)
-                    # Освобождаем блок самого дочернего узла
-                    self._free_block(idx.child_block)
+                    collect_node_blocks(child_data)
+                    # Блок самого дочернего узла тоже освобождается
+                    runs.append((idx.child_block, 1))
 
         # Начинаем с корневого узла
-        free_node_blocks(inode.extent_root)
-
-        # Сбрасываем дерево экстентов
-        header = ExtentHeader(magic=0xF30A, entries_count=0, max_entries=3, depth=0)
-        inode.extent_root = header.pack() + b'\x00' * 40
+        collect_node_blocks(inode.extent_root)
+        return runs
 
     def _free_inode(self, inode_num: int):
         """Free an inode"""
-        group_num, inode_index, group_desc, _ = self._resolve_inode_location(inode_num)
+        self._free_inodes([inode_num])
 
-        # Read inode bitmap
-        self.image_file.seek(group_desc.inode_bitmap_block * BLOCK_SIZE)
-        bitmap = bytearray(self.image_file.read(BLOCK_SIZE))
+    def _free_inodes(self, inode_nums: List[int]):
+        """Free inodes, reading and writing each group's inode bitmap once"""
+        group_masks: Dict[int, int] = {}
+        for inode_num in inode_nums:
+            group_num, inode_index, _, _ = self._resolve_inode_location(inode_num)
+            group_masks[group_num] = group_masks.get(group_num, 0) | (1 << inode_index)
 
-        byte_idx = inode_index // 8
-        bit_idx = inode_index % 8
+            # Номер инода может быть переиспользован, записи освобождённого каталога недействительны
+            self._dentry_cache.pop(inode_num, None)
+            self._dentry_complete.discard(inode_num)
+            self._dentry_free_hint.pop(inode_num, None)
 
-        # Only free and update counts if the inode was actually in use
-        if bitmap[byte_idx] & (1 << bit_idx):
-            # Clear inode bit
-            bitmap[byte_idx] &= ~(1 << bit_idx)
+        freed_total = 0
+        for group_num, mask in sorted(group_masks.items()):
+            group_desc = self.group_descriptors[group_num]
+
+            # Read inode bitmap
+            self.image_file.seek(group_desc.inode_bitmap_block * BLOCK_SIZE)
+            bitmap = int.from_bytes(self.image_file.read(BLOCK_SIZE), "little")
+
+            # Only free and update counts for inodes that were actually in use
+            cleared = bitmap & mask
+            if not cleared:
+                continue
 
             # Write bitmap back
             self.image_file.seek(group_desc.inode_bitmap_block * BLOCK_SIZE)
-            self.image_file.write(bitmap)
+            self.image_file.write((bitmap ^ cleared).to_bytes(BLOCK_SIZE, "little"))
 
             # Update group descriptor
-            group_desc.free_inodes_count += 1
+            freed = cleared.bit_count()
+            group_desc.free_inodes_count += freed
             self.group_descriptors[group_num] = group_desc  # Update in-memory copy
             self._write_group_descriptor(group_num, group_desc)
+            freed_total += freed
 
+        if freed_total:
             # Update superblock
-            self.superblock.free_inodes_count += 1
+            self.superblock.free_inodes_count += freed_total
             self._write_superblock()
 
     def _remove_directory_entry(self, dir_inode_num: int, filename: str):
         """Remove entry from directory"""
+        self._remove_directory_entries(dir_inode_num, [filename])
+
+    def _remove_directory_entries(self, dir_inode_num: int, filenames: List[str]):
+        """Remove entries from directory in one pass, writing each changed block once"""
         dir_inode = self._get_inode(dir_inode_num)
 
         if not ((dir_inode.mode & S_IFMT) == S_IFDIR):
             raise OSError("Not a directory")
 
+        pending = set(filenames)
+        cached = self._dentry_cache.get(dir_inode_num, {})
+        for filename in pending:
+            cached.pop(filename, None)
+
         # Read directory blocks through extent tree
         file_size = dir_inode.size_lo | (dir_inode.size_high << 32)
         bytes_read = 0
 
-        while bytes_read < file_size:
+        while pending and bytes_read < file_size:
             logical_block = bytes_read // BLOCK_SIZE
             leaf = self._find_extent(dir_inode, logical_block)
             if leaf is None:
@@ -664,16 +886,17 @@ class FileSystem:
 
             self.image_file.seek(physical_block * BLOCK_SIZE)
             block_data = bytearray(self.image_file.read(BLOCK_SIZE))
+            modified = False
 
             # Parse directory entries
             offset = 0
             prev_entry_offset = -1
             prev_entry_len = 0
 
-            while offset < len(block_data):
+            while pending and offset < len(block_data):
                 try:
                     # Читаем текущую запись, чтобы получить ее длину
-                    result = DirEntry.unpack(bytes(block_data), offset)
+                    result = DirEntry.unpack(block_data, offset)
                     if result[0] is None:
                         # Дошли до конца или пустой области
                         if result[1] > 0:
@@ -681,24 +904,23 @@ class FileSystem:
                             continue
                         else:
                             break
-                    
+
                     entry, entry_len = result
-                    
-                    if entry.name == filename:
+
+                    if entry.name in pending:
                         # Нашли запись для удаления
+                        pending.discard(entry.name)
                         if prev_entry_offset != -1:
                             # Есть предыдущая запись, "поглощаем" текущую
                             # Новая длина предыдущей записи = ее старая длина + длина удаляемой
-                            new_prev_len = prev_entry_len + entry_len
-                            struct.pack_into("<I", block_data, prev_entry_offset + 4, new_prev_len)
+                            prev_entry_len += entry_len
+                            struct.pack_into("<I", block_data, prev_entry_offset + 4, prev_entry_len)
                         else:
                             # Это первая запись в блоке, просто зануляем ее inode
                             struct.pack_into("<I", block_data, offset, 0)
-                        
-                        # Записываем измененный блок и выходим
-                        self.image_file.seek(physical_block * BLOCK_SIZE)
-                        self.image_file.write(block_data)
-                        return
+                        modified = True
+                        offset += entry_len
+                        continue
 
                     # Запоминаем текущую запись как предыдущую для следующей итерации
                     prev_entry_offset = offset
@@ -710,9 +932,18 @@ class FileSystem:
                 except (ValueError, UnicodeDecodeError):
                     break
 
+            if modified:
+                # Записываем измененный блок один раз
+                self.image_file.seek(physical_block * BLOCK_SIZE)
+                self.image_file.write(block_data)
+                # Освободилось место: следующий поиск начнём не дальше этого блока
+                if self._dentry_free_hint.get(dir_inode_num, 0) > logical_block:
+                    self._dentry_free_hint[dir_inode_num] = logical_block
+
             bytes_read += BLOCK_SIZE
 
-        raise FileNotFoundError(f"No such file or directory: {filename}")
+        if pending:
+            raise FileNotFoundError(f"No such file or directory: {sorted(pending)[0]}")
 
     def _resolve_path(self, path: str, *, follow_links: bool = True, _depth: int = 0) -> int:
         """Resolve path to inode number with symlink depth protection"""
@@ -745,7 +976,7 @@ class FileSystem:
             if not ((current_inode.mode & S_IFMT) == S_IFDIR):
                 raise OSError(f"Not a directory: {component}")
 
-            found_inode_num = self._find_file_in_directory(current_inode, component)
+            found_inode_num = self._lookup_dentry(current_inode_num, current_inode, component)
             if found_inode_num is None:
                 raise FileNotFoundError(f"No such file or directory: {component}")
 
@@ -769,6 +1000,25 @@ class FileSystem:
 
         return current_inode_num
 
+    def _inode_by_path(self, path: str, *, follow_links: bool = True) -> Tuple[int, Inode]:
+        """Resolve path once and return (inode_num, inode)"""
+        inode_num = self._resolve_path(path, follow_links=follow_links)
+        return inode_num, self._get_inode(inode_num)
+
+    def _lookup_parent_and_check(self, path: str) -> Tuple[int, str, Optional[int]]:
+        """
+        Resolve the parent directory of path once and look up its last component.
+        Returns: (parent_inode_num, name, existing_inode_num or None)
+        """
+        parent_path = posixpath.dirname(path)
+        name = posixpath.basename(path)
+
+        if parent_path == "":
+            parent_path = "/"
+
+        parent_inode_num, parent_inode = self._inode_by_path(parent_path)
+        return parent_inode_num, name, self._lookup_dentry(parent_inode_num, parent_inode, name)
+
     # Public API methods
 
     def open(self, path: str, flags: int = O_RDONLY, mode: int = 0o644) -> int:
@@ -796,24 +1046,7 @@ class FileSystem:
                 inode_num = self._allocate_inode()
 
                 # Create file inode
-                current_time = int(time.time())
-                # Инициализация пустого корня дерева экстентов
-                header = ExtentHeader(magic=0xF30A, entries_count=0, max_entries=3, depth=0)
-                extent_root = header.pack() + b'\x00' * (INODE_EXTENT_ROOT_SIZE - len(header.pack()))
-                inode = Inode(
-                    mode=S_IFREG | mode,
-                    uid=0,
-                    size_lo=0,
-                    gid=0,
-                    links_count=1,
-                    size_high=0,
-                    atime=current_time,
-                    ctime=current_time,
-                    mtime=current_time,
-                    flags=0,
-                    extent_root=extent_root,
-                )
-
+                inode = self._new_file_inode(mode)
                 self._write_inode(inode_num, inode)
 
                 # Add to parent directory
@@ -823,6 +1056,24 @@ class FileSystem:
             else:
                 raise
 
+        return self._open_inode(inode_num, inode, path, flags)
+
+    def open_inode(self, inode_num: int, flags: int = O_RDONLY) -> int:
+        """Open a regular file by inode number (e.g. from readdirplus), skipping path lookup"""
+        try:
+            inode = self._get_inode(inode_num)
+        except ValueError:
+            raise FileNotFoundError(f"No such inode: {inode_num}")
+        # Освобождённый инод сохраняет mode, но ссылок на него уже нет
+        if inode.mode == 0 or inode.links_count == 0:
+            raise FileNotFoundError(f"No such inode: {inode_num}")
+        if not ((inode.mode & S_IFMT) == S_IFREG):
+            raise OSError("Not a regular file")
+
+        return self._open_inode(inode_num, inode, "", flags & ~O_CREAT)
+
+    def _open_inode(self, inode_num: int, inode: Inode, path: str, flags: int) -> int:
+        """Apply O_TRUNC and register a descriptor for an already resolved inode"""
         # Truncate if requested
         if flags & O_TRUNC:
             inode.size_lo = 0
@@ -830,7 +1081,30 @@ class FileSystem:
             self._free_inode_blocks(inode)
             self._write_inode(inode_num, inode)
 
-        # Create file descriptor
+        return self._new_descriptor(inode_num, path, flags, inode)
+
+    def _new_file_inode(self, mode: int) -> Inode:
+        """Build an empty regular file inode"""
+        current_time = int(time.time())
+        # Инициализация пустого корня дерева экстентов
+        header = ExtentHeader(magic=0xF30A, entries_count=0, max_entries=3, depth=0)
+        extent_root = header.pack() + b'\x00' * (INODE_EXTENT_ROOT_SIZE - len(header.pack()))
+        return Inode(
+            mode=S_IFREG | mode,
+            uid=0,
+            size_lo=0,
+            gid=0,
+            links_count=1,
+            size_high=0,
+            atime=current_time,
+            ctime=current_time,
+            mtime=current_time,
+            flags=0,
+            extent_root=extent_root,
+        )
+
+    def _new_descriptor(self, inode_num: int, path: str, flags: int, inode: Inode) -> int:
+        """Register an open file descriptor for inode"""
         fd = self.next_fd
         self.next_fd += 1
 
@@ -840,6 +1114,62 @@ class FileSystem:
 
         return fd
 
+    def _check_name(self, name: str):
+        """Reject names that cannot be stored as a single directory entry"""
+        if name in ("", ".", ".."):
+            raise OSError(f"Invalid file name: {name!r}")
+        if "/" in name:
+            raise OSError(f"File name must not contain '/': {name!r}")
+        if len(name.encode("utf-8")) > MAX_NAME_LEN:
+            raise OSError(f"File name too long: {name[:16]!r}...")
+
+    def create_many(
+        self, parent_path: str, entries: List[Tuple[str, Union[bytes, bytearray, memoryview]]], mode: int = 0o644
+    ) -> List[int]:
+        """
+        Create regular files (name, data) in one directory; returns their inode numbers.
+        The parent is resolved once, inodes are allocated in one bitmap pass
+        and the directory entries are appended in a single pass over its blocks.
+        """
+        parent_inode_num, parent_inode = self._inode_by_path(parent_path)
+        if not ((parent_inode.mode & S_IFMT) == S_IFDIR):
+            raise OSError("Not a directory")
+
+        # Проверяем имена до того, как что-либо выделить
+        names = {entry.name for entry, _, _ in self._traverse_directory(parent_inode) if entry}
+        for filename, _ in entries:
+            self._check_name(filename)
+            if filename in names:
+                raise OSError(f"File already exists: {filename}")
+            names.add(filename)
+
+        inode_nums = self._allocate_inodes(len(entries))
+        try:
+            for inode_num in inode_nums:
+                self._write_inode(inode_num, self._new_file_inode(mode))
+            self._add_directory_entries(
+                parent_inode_num, [(filename, inode_num, 1) for inode_num, (filename, _) in zip(inode_nums, entries)]
+            )
+        except OSError:
+            # Каталог не смог вырасти: иноды, не попавшие в него, возвращаем, иначе они утекут
+            parent_inode = self._get_inode(parent_inode_num)
+            linked = {entry.inode_num for entry, _, _ in self._traverse_directory(parent_inode) if entry}
+            self._free_inodes([inode_num for inode_num in inode_nums if inode_num not in linked])
+            raise
+
+        for inode_num, (filename, data) in zip(inode_nums, entries):
+            if not data:
+                continue
+            fd = self._new_descriptor(
+                inode_num, posixpath.join(parent_path, filename), O_WRONLY, self._get_inode(inode_num)
+            )
+            try:
+                self.write(fd, data)
+            finally:
+                self.close(fd)
+
+        return inode_nums
+
     def close(self, fd: int):
         """Close file descriptor"""
         if fd not in self.open_files:
@@ -856,8 +1186,8 @@ class FileSystem:
                 self._free_inode_blocks(inode_meta)
                 self._free_inode(file_desc.inode_num)
 
-    def read(self, fd: int, size: int, offset: Optional[int] = None) -> bytes:
-        """Read data from file"""
+    def _open_for_read(self, fd: int) -> Tuple[FileDescriptor, Inode]:
+        """Validate a descriptor for reading and return it with its current inode"""
         if fd not in self.open_files:
             raise OSError("Bad file descriptor")
 
@@ -867,78 +1197,116 @@ class FileSystem:
             raise OSError("File not open for reading")
 
         # Get current inode (in case it was updated)
-        inode = self._get_inode(file_desc.inode_num)
+        return file_desc, self._get_inode(file_desc.inode_num)
 
+    def _read_into(self, inode: Inode, view: memoryview, read_offset: int) -> int:
+        """Fill view from the file at read_offset; returns the number of bytes stored"""
         # If it's a symlink, read the target path
         if (inode.mode & S_IFMT) == S_IFLNK:
             target_data = self._read_symlink_target(inode)
-            # Use provided offset or file descriptor offset
-            read_offset = offset if offset is not None else file_desc.offset
             if read_offset >= len(target_data):
-                return b""
-            actual_size = min(size, len(target_data) - read_offset)
-            result = target_data[read_offset:read_offset + actual_size]
-            # Update offset if not using explicit offset
-            if offset is None:
-                file_desc.offset += len(result)
-            return result
+                return 0
+            actual_size = min(len(view), len(target_data) - read_offset)
+            view[:actual_size] = target_data[read_offset:read_offset + actual_size]
+            bytes_read = actual_size
         else:
             # Regular file
             file_size = inode.size_lo | (inode.size_high << 32)
 
-            # Use provided offset or file descriptor offset
-            read_offset = offset if offset is not None else file_desc.offset
-
             if read_offset >= file_size:
-                return b""
+                return 0
 
             # Limit read size to file size
-            actual_size = min(size, file_size - read_offset)
-            
-            result = bytearray()
+            actual_size = min(len(view), file_size - read_offset)
             bytes_read = 0
-            
+
             while bytes_read < actual_size:
                 # Вычисляем логический блок для текущего смещения
                 logical_block = (read_offset + bytes_read) // BLOCK_SIZE
-                
+
+                # Вычисляем смещение внутри блока
+                block_offset = (read_offset + bytes_read) % BLOCK_SIZE
+
                 # Находим экстент для этого логического блока
                 leaf = self._find_extent(inode, logical_block)
-                if leaf is None:
-                    # Дыра в файле - заполняем нулями
-                    hole_size = min(actual_size - bytes_read, BLOCK_SIZE - ((read_offset + bytes_read) % BLOCK_SIZE))
-                    result.extend(b'\x00' * hole_size)
-                    bytes_read += hole_size
+                if leaf is None or logical_block - leaf.logical_block >= leaf.block_count:
+                    # Дыра в файле (или вне диапазона экстента) - заполняем нулями
+                    bytes_to_read = min(actual_size - bytes_read, BLOCK_SIZE - block_offset)
+                    view[bytes_read:bytes_read + bytes_to_read] = bytes(bytes_to_read)
+                    bytes_read += bytes_to_read
                     continue
-                
+
                 # Вычисляем физический блок
-                block_offset_in_extent = logical_block - leaf.logical_block
-                if block_offset_in_extent >= leaf.block_count:
-                    # Вне диапазона экстента
-                    hole_size = min(actual_size - bytes_read, BLOCK_SIZE - ((read_offset + bytes_read) % BLOCK_SIZE))
-                    result.extend(b'\x00' * hole_size)
-                    bytes_read += hole_size
-                    continue
-                    
-                physical_block = leaf.get_start_block() + block_offset_in_extent
-                
-                # Вычисляем смещение внутри блока
-                block_offset = (read_offset + bytes_read) % BLOCK_SIZE
-                
-                # Определяем, сколько байт можно прочитать из этого блока
-                bytes_to_read = min(actual_size - bytes_read, BLOCK_SIZE - block_offset)
-                
-                # Читаем данные
+                physical_block = leaf.get_start_block() + logical_block - leaf.logical_block
+
+                # Экстент непрерывен на диске: читаем весь его остаток одним вызовом
+                blocks_left = leaf.logical_block + leaf.block_count - logical_block
+                bytes_to_read = min(actual_size - bytes_read, blocks_left * BLOCK_SIZE - block_offset)
+
+                # Читаем данные прямо в буфер вызывающего
                 self.image_file.seek(physical_block * BLOCK_SIZE + block_offset)
-                chunk = self.image_file.read(bytes_to_read)
-                result.extend(chunk)
-                bytes_read += len(chunk)
-            
-            # Update offset if not using explicit offset
-            if offset is None:
-                file_desc.offset += bytes_read
-                
-            return bytes(result)
+                got = self.image_file.readinto(view[bytes_read:bytes_read + bytes_to_read])
+                if not got:
+                    break
+                bytes_read += got
+
+        return bytes_read
+
+    def _read_at(self, file_desc: FileDescriptor, inode: Inode, view: memoryview,
+                 offset: Optional[int]) -> int:
+        """Read into view at offset or at the descriptor position, advancing the latter"""
+        # Use provided offset or file descriptor offset
+        read_offset = offset if offset is not None else file_desc.offset
+        bytes_read = self._read_into(inode, view, read_offset)
+
+        # Update offset if not using explicit offset
+        if offset is None:
+            file_desc.offset += bytes_read
+
+        return bytes_read
+
+    def read(self, fd: int, size: int, offset: Optional[int] = None) -> bytes:
+        """Read data from file"""
+        file_desc, inode = self._open_for_read(fd)
+
+        if (inode.mode & S_IFMT) == S_IFLNK:
+            available = len(self._read_symlink_target(inode))
+        else:
+            available = inode.size_lo | (inode.size_high << 32)
+        read_offset = offset if offset is not None else file_desc.offset
+        result = bytearray(max(0, min(size, available - read_offset)))
+
+        bytes_read = self._read_at(file_desc, inode, memoryview(result), offset)
+        del result[bytes_read:]
+        return bytes(result)
+
+    def readinto(self, fd: int, buffer: Union[bytearray, memoryview], offset: Optional[int] = None) -> int:
+        """Read into a caller-supplied writable buffer; returns bytes read"""
+        file_desc, inode = self._open_for_read(fd)
+        with memoryview(buffer) as view:
+            return self._read_at(file_desc, inode, view.cast('B'), offset)
+
+    def read_file(self, path: str, max_bytes: Optional[int] = None) -> bytes:
+        """Read a whole file (or its first max_bytes) without opening a descriptor"""
+        _, inode = self._inode_by_path(path)
+        if (inode.mode & S_IFMT) != S_IFREG:
+            raise OSError("Not a regular file")
+
+        size = inode.size_lo | (inode.size_high << 32)
+        if max_bytes is not None:
+            size = min(size, max_bytes)
+        result = bytearray(size)
+        bytes_read = self._read_into(inode, memoryview(result), 0)
+        del result[bytes_read:]
+        return bytes(result)
+
+    def write_file(self, path: str, data: Union[bytes, bytearray, memoryview], truncate: bool = True) -> int:
+        """Create or overwrite a file from the start with data; returns bytes written"""
+        fd = self.open(path, O_CREAT | O_WRONLY | (O_TRUNC if truncate else 0))
+        try:
+            return self.write(fd, data)
+        finally:
+            self.close(fd)
 
     def _try_extend_adjacent_extent(self, inode: Inode, logical_block: int) -> Tuple[Optional[ExtentLeaf], Inode]:
         """
@@ -964,7 +1332,11 @@ class FileSystem:
         group_desc = self.group_descriptors[group_num]
 
         # Check if the group has any free blocks before proceeding
-        if group_desc.free_blocks_count == 0:
+        if group_desc.free_blocks_count == 0 or self.superblock.free_blocks_count <= 0:
+            return None, inode
+
+        # Не выходим за конец образа: биты после последнего блока в битмапе свободны
+        if next_physical_block >= self.superblock.fs_size_blocks:
             return None, inode
 
         self.image_file.seek(group_desc.block_bitmap_block * BLOCK_SIZE)
@@ -987,8 +1359,8 @@ class FileSystem:
         inode = self._update_leaf_in_tree(inode, prev_leaf, extended_leaf)
         return extended_leaf, inode
 
-    def write(self, fd: int, data: bytes, offset: Optional[int] = None) -> int:
-        """Write data to file (fixed: always allocate new block/extents after truncate or for empty file)"""
+    def _open_for_write(self, fd: int) -> FileDescriptor:
+        """Validate a descriptor for writing"""
         if fd not in self.open_files:
             raise OSError("Bad file descriptor")
 
@@ -997,83 +1369,186 @@ class FileSystem:
         if file_desc.flags == O_RDONLY:
             raise OSError("File not open for writing")
 
-        # Get current inode once before the loop
-        inode = self._get_inode(file_desc.inode_num)
-        file_size = inode.size_lo | (inode.size_high << 32)
+        return file_desc
+
+    def write(self, fd: int, data: Union[bytes, bytearray, memoryview], offset: Optional[int] = None) -> int:
+        """Write data to file (fixed: always allocate new block/extents after truncate or for empty file)"""
+        file_desc = self._open_for_write(fd)
 
         # Use provided offset or file descriptor offset
         write_offset = offset if offset is not None else file_desc.offset
 
-        # Calculate new file size
-        new_size = max(file_size, write_offset + len(data))
+        return self._write_pieces(file_desc, [(write_offset, data)], advance_offset=offset is None)
 
-        bytes_written = 0
-        data_offset = 0
+    def pwrite_many(self, fd: int, io_vec: List[Tuple[int, Union[bytes, bytearray, memoryview]]]) -> int:
+        """
+        Write several (offset, data) pieces in one call; returns total bytes written.
+        Pieces are applied in offset order, the inode is written once at the end.
+        """
+        file_desc = self._open_for_write(fd)
+        return self._write_pieces(file_desc, sorted(io_vec, key=lambda piece: piece[0]), advance_offset=False)
 
-        while bytes_written < len(data):
-            current_offset = write_offset + bytes_written
-            logical_block = current_offset // BLOCK_SIZE
-            block_offset = current_offset % BLOCK_SIZE
+    def fallocate(self, fd: int, length: int) -> int:
+        """
+        Allocate all blocks of the first length bytes of the file, extending its size to at least length.
+        Existing data is kept; blocks that were holes are zeroed, since extents have no uninitialized flag.
+        Returns the number of hole bytes zero-filled below length, not the size of the blocks allocated.
+        """
+        file_desc = self._open_for_write(fd)
+        inode = self._get_inode(file_desc.inode_num)
+        file_size = inode.size_lo | (inode.size_high << 32)
 
-            # Найти экстент для этого логического блока
-            leaf = self._find_extent(inode, logical_block)
+        # Собираем непрерывные дыры среди первых блоков файла
+        holes = []
+        hole_start = None
+        for logical_block in range((length + BLOCK_SIZE - 1) // BLOCK_SIZE):
+            if self._find_extent(inode, logical_block) is None:
+                if hole_start is None:
+                    hole_start = logical_block
+            elif hole_start is not None:
+                holes.append((hole_start, logical_block))
+                hole_start = None
+        if hole_start is not None:
+            holes.append((hole_start, (length + BLOCK_SIZE - 1) // BLOCK_SIZE))
+
+        allocated = 0
+        if holes:
+            # Дыры заполняем нулями одной пачкой: целые блоки уходят сериями из общего буфера
+            zeros = memoryview(bytes(max(end - start for start, end in holes) * BLOCK_SIZE))
+            pieces = []
+            for start, end in holes:
+                piece_len = min(end * BLOCK_SIZE, length) - start * BLOCK_SIZE
+                pieces.append((start * BLOCK_SIZE, zeros[:piece_len]))
+            allocated = self._write_pieces(file_desc, pieces, advance_offset=False)
+            inode = self._get_inode(file_desc.inode_num)
+            file_size = inode.size_lo | (inode.size_high << 32)
 
-            if leaf is None:
-                # Попытка расширить экстент
-                extended_leaf, inode = self._try_extend_adjacent_extent(inode, logical_block)
-                if extended_leaf is None:
-                    # Расширить не удалось, создаем новый
-                    new_block = self._allocate_block()
-                    new_leaf = ExtentLeaf(
-                        logical_block=logical_block,
-                        block_count=1,
-                        start_block_hi=(new_block >> 32),
-                        start_block_lo=(new_block & 0xFFFFFFFF)
-                    )
-                    inode = self._insert_extent(inode, new_leaf)
-                    leaf = self._find_extent(inode, logical_block)
-                    if leaf is None:
-                        raise OSError("Failed to find newly created extent")
-                else:
-                    leaf = extended_leaf
-                # Вычисляем физический блок
-                block_offset_in_extent = logical_block - leaf.logical_block
-                physical_block = leaf.get_start_block() + block_offset_in_extent
+        if length > file_size:
+            inode.size_lo = length & 0xFFFFFFFF
+            inode.size_high = length >> 32
+            self._write_inode(file_desc.inode_num, inode)
+        return allocated
 
-                # Create empty block data (don't read garbage from disk)
-                block_data = bytearray(BLOCK_SIZE)
-            else:
-                # Overwrite Path: Read existing block data
-                block_offset_in_extent = logical_block - leaf.logical_block
-                physical_block = leaf.get_start_block() + block_offset_in_extent
+    def _write_pieces(
+        self, file_desc: FileDescriptor, pieces: List[Tuple[int, Union[bytes, bytearray, memoryview]]], advance_offset: bool
+    ) -> int:
+        """Write (offset, data) pieces to the descriptor's inode and persist its metadata once"""
+        # Get current inode once before the loop
+        inode = self._get_inode(file_desc.inode_num)
+        new_size = inode.size_lo | (inode.size_high << 32)
 
-                # Читаем существующий блок
-                self.image_file.seek(physical_block * BLOCK_SIZE)
-                block_data = bytearray(self.image_file.read(BLOCK_SIZE))
+        total_written = 0
+        write_offset, bytes_written = 0, 0
+        # Накопленная серия целых блоков, идущих подряд на диске: (первый блок, начало в data, длина)
+        run_block, run_from, run_len = 0, 0, 0
+        # Частично изменённые блоки: физический номер -> содержимое, пишутся один раз в конце
+        dirty_blocks: Dict[int, bytearray] = {}
 
-            # Записываем данные в блок
-            chunk_size = min(len(data) - data_offset, BLOCK_SIZE - block_offset)
-            block_data[block_offset:block_offset + chunk_size] = data[data_offset:data_offset + chunk_size]
+        # Блоки, уже добавленные в дерево экстентов, сохраняем в inode даже при ошибке
+        # (например, нехватке места), иначе они теряются до следующего fsck
+        try:
+            for write_offset, data in pieces:
+                bytes_written = 0
+                data_offset = 0
+                # Срезы memoryview не копируют данные вызывающего
+                view = memoryview(data)
+
+                while bytes_written < len(data):
+                    current_offset = write_offset + bytes_written
+                    logical_block = current_offset // BLOCK_SIZE
+                    block_offset = current_offset % BLOCK_SIZE
+
+                    # Найти экстент для этого логического блока
+                    leaf = self._find_extent(inode, logical_block)
 
-            # Записываем блок обратно
-            self.image_file.seek(physical_block * BLOCK_SIZE)
-            self.image_file.write(block_data)
+                    if leaf is None:
+                        # Попытка расширить экстент
+                        extended_leaf, inode = self._try_extend_adjacent_extent(inode, logical_block)
+                        if extended_leaf is None:
+                            # Расширить не удалось, создаем новый
+                            new_block = self._allocate_block()
+                            new_leaf = ExtentLeaf(
+                                logical_block=logical_block,
+                                block_count=1,
+                                start_block_hi=(new_block >> 32),
+                                start_block_lo=(new_block & 0xFFFFFFFF)
+                            )
+                            inode = self._insert_extent(inode, new_leaf)
+                            leaf = self._find_extent(inode, logical_block)
+                            if leaf is None:
+                                raise OSError("Failed to find newly created extent")
+                        else:
+                            leaf = extended_leaf
+                        # Вычисляем физический блок
+                        block_offset_in_extent = logical_block - leaf.logical_block
+                        physical_block = leaf.get_start_block() + block_offset_in_extent
+                        block_is_new = True
+                    else:
+                        # Overwrite Path
+                        block_offset_in_extent = logical_block - leaf.logical_block
+                        physical_block = leaf.get_start_block() + block_offset_in_extent
+                        block_is_new = False
+
+                    chunk_size = min(len(data) - data_offset, BLOCK_SIZE - block_offset)
+                    if chunk_size == BLOCK_SIZE:
+                        # Блок перезаписывается целиком: продлеваем серию или начинаем новую,
+                        # данные уйдут на диск одним write прямо из буфера
+                        dirty_blocks.pop(physical_block, None)
+                        if run_len and physical_block == run_block + run_len // BLOCK_SIZE:
+                            run_len += BLOCK_SIZE
+                        else:
+                            if run_len:
+                                self.image_file.seek(run_block * BLOCK_SIZE)
+                                self.image_file.write(view[run_from:run_from + run_len])
+                            run_block, run_from, run_len = physical_block, data_offset, BLOCK_SIZE
+                    else:
+                        block_data = dirty_blocks.get(physical_block)
+                        if block_data is None:
+                            if block_is_new:
+                                # Create empty block data (don't read garbage from disk)
+                                block_data = bytearray(BLOCK_SIZE)
+                            else:
+                                # Читаем существующий блок
+                                self.image_file.seek(physical_block * BLOCK_SIZE)
+                                block_data = bytearray(self.image_file.read(BLOCK_SIZE))
+                            dirty_blocks[physical_block] = block_data
+
+                        # Записываем данные в блок
+                        block_data[block_offset:block_offset + chunk_size] = view[data_offset:data_offset + chunk_size]
+
+                    bytes_written += chunk_size
+                    data_offset += chunk_size
+                    total_written += chunk_size
+
+                # Серия ссылается на буфер текущего куска: дописываем её до следующего
+                if run_len:
+                    self.image_file.seek(run_block * BLOCK_SIZE)
+                    self.image_file.write(view[run_from:run_from + run_len])
+                    run_len = 0
+
+                new_size = max(new_size, write_offset + bytes_written)
+        finally:
+            # Дописываем незавершённую серию: total_written её уже учитывает
+            if run_len:
+                self.image_file.seek(run_block * BLOCK_SIZE)
+                self.image_file.write(view[run_from:run_from + run_len])
+            for physical_block in sorted(dirty_blocks):
+                self.image_file.seek(physical_block * BLOCK_SIZE)
+                self.image_file.write(dirty_blocks[physical_block])
             self.image_file.flush()
 
-            bytes_written += chunk_size
-            data_offset += chunk_size
+            # Обновляем метаданные inode
+            new_size = max(new_size, write_offset + bytes_written)
+            inode.size_lo = new_size & 0xFFFFFFFF
+            inode.size_high = new_size >> 32
+            inode.mtime = int(time.time())
+            self._write_inode(file_desc.inode_num, inode)
 
-        # Обновляем метаданные inode
-        inode.size_lo = new_size & 0xFFFFFFFF
-        inode.size_high = new_size >> 32
-        inode.mtime = int(time.time())
-        self._write_inode(file_desc.inode_num, inode)
+            # Обновляем offset дескриптора
+            if advance_offset:
+                file_desc.offset += total_written
 
-        # Обновляем offset дескриптора
-        if offset is None:
-            file_desc.offset += bytes_written
-
-        return bytes_written
+        return total_written
 
     def unlink(self, path: str):
         """Delete file"""
@@ -1091,7 +1566,7 @@ class FileSystem:
             raise OSError("Parent is not a directory")
 
         # Find file in parent directory
-        file_inode_num = self._find_file_in_directory(parent_inode, filename)
+        file_inode_num = self._lookup_dentry(parent_inode_num, parent_inode, filename)
         if file_inode_num is None:
             raise FileNotFoundError("No such file or directory")
 
@@ -1119,6 +1594,62 @@ class FileSystem:
             self._free_inode_blocks(file_inode)
             self._free_inode(file_inode_num)
 
+    def unlink_many(self, paths: List[str]):
+        """
+        Delete several files. Every parent is resolved once, each directory is
+        rewritten in a single pass and the freed blocks and inodes are released
+        with one bitmap update per group.
+        """
+        # Сначала проверяем все пути, чтобы не удалить только часть
+        by_parent: Dict[str, Dict[str, int]] = {}
+        parent_inode_nums: Dict[str, int] = {}
+        inodes: Dict[int, Inode] = {}
+        for path in paths:
+            parent_path = posixpath.dirname(path) or "/"
+            filename = posixpath.basename(path)
+
+            if parent_path not in parent_inode_nums:
+                parent_inode_num, parent_inode = self._inode_by_path(parent_path)
+                if not ((parent_inode.mode & S_IFMT) == S_IFDIR):
+                    raise OSError("Parent is not a directory")
+                parent_inode_nums[parent_path] = parent_inode_num
+            parent_inode_num = parent_inode_nums[parent_path]
+
+            names = by_parent.setdefault(parent_path, {})
+            file_inode_num = None
+            if filename not in names:
+                file_inode_num = self._lookup_dentry(parent_inode_num, self._get_inode(parent_inode_num), filename)
+            if file_inode_num is None:
+                raise FileNotFoundError(f"No such file or directory: {path}")
+
+            file_inode = inodes.setdefault(file_inode_num, self._get_inode(file_inode_num))
+            # Can only unlink regular files or symbolic links
+            file_type = file_inode.mode & S_IFMT
+            if not (file_type == S_IFREG or file_type == S_IFLNK):
+                raise OSError("Can only unlink regular files or symbolic links")
+            names[filename] = file_inode_num
+
+        # Remove from directories
+        for parent_path, names in by_parent.items():
+            self._remove_directory_entries(parent_inode_nums[parent_path], list(names))
+            for file_inode_num in names.values():
+                inodes[file_inode_num].links_count -= 1
+
+        open_inodes = {fd.inode_num for fd in self.open_files.values()}
+        block_runs: List[Tuple[int, int]] = []
+        freed_inodes: List[int] = []
+        for file_inode_num, file_inode in inodes.items():
+            if file_inode.links_count == 0 and file_inode_num not in open_inodes:
+                # Free blocks and inode only when no links and no open descriptors
+                block_runs.extend(self._collect_block_runs(file_inode))
+                header = ExtentHeader(magic=0xF30A, entries_count=0, max_entries=3, depth=0)
+                file_inode.extent_root = header.pack() + b'\x00' * 40
+                freed_inodes.append(file_inode_num)
+            self._write_inode(file_inode_num, file_inode)
+
+        self._free_block_runs(block_runs)
+        self._free_inodes(freed_inodes)
+
     def mkdir(self, path: str, mode: int = 0o755):
         """Create directory"""
         parent_path = posixpath.dirname(path)
@@ -1136,6 +1667,39 @@ class FileSystem:
         except FileNotFoundError:
             pass
 
+        self._create_directory(parent_inode_num, dirname, mode)
+
+    def mkdirs(self, path: str, mode: int = 0o755):
+        """Create directory with all missing parents (mkdir -p) in one walk from the root"""
+        components = []
+        for comp in path.strip("/").split("/"):
+            if comp == "" or comp == ".":
+                continue
+            elif comp == "..":
+                if components:
+                    components.pop()
+            else:
+                components.append(comp)
+
+        current_inode_num = ROOT_INODE
+        for index, component in enumerate(components):
+            current_inode = self._get_inode(current_inode_num)
+            if not ((current_inode.mode & S_IFMT) == S_IFDIR):
+                raise OSError(f"Not a directory: {components[index - 1]}")
+
+            found_inode_num = self._lookup_dentry(current_inode_num, current_inode, component)
+            if found_inode_num is None:
+                # Родитель уже найден: создаём компонент без повторного обхода пути
+                found_inode_num = self._create_directory(current_inode_num, component, mode)
+            elif (self._get_inode(found_inode_num).mode & S_IFMT) == S_IFLNK:
+                found_inode_num = self._resolve_path("/" + "/".join(components[:index + 1]))
+            current_inode_num = found_inode_num
+
+        if components and not ((self._get_inode(current_inode_num).mode & S_IFMT) == S_IFDIR):
+            raise OSError(f"Not a directory: {components[-1]}")
+
+    def _create_directory(self, parent_inode_num: int, dirname: str, mode: int) -> int:
+        """Create directory dirname in an already resolved parent; returns its inode number"""
         # Allocate inode for new directory
         dir_inode_num = self._allocate_inode()
 
@@ -1187,6 +1751,100 @@ class FileSystem:
         parent_inode.links_count += 1
         self._write_inode(parent_inode_num, parent_inode)
 
+        return dir_inode_num
+
+    def rename(self, src: str, dst: str):
+        """Rename file or directory by rewriting directory entries, without touching its data"""
+        src_parent_num, src_name, src_inode_num = self._lookup_parent_and_check(src)
+        if src_inode_num is None:
+            raise FileNotFoundError(f"No such file or directory: {src_name}")
+
+        dst_name = posixpath.basename(dst)
+        if src_name in (".", "..") or dst_name in (".", ".."):
+            # Как rename(2) (EINVAL): записи "." и ".." переносить нельзя
+            raise OSError(errno.EINVAL, "Invalid argument: cannot rename '.' or '..'")
+
+        src_inode = self._get_inode(src_inode_num)
+        src_is_dir = (src_inode.mode & S_IFMT) == S_IFDIR
+
+        dst_parent_num, dst_name, dst_inode_num = self._lookup_parent_and_check(dst)
+        if dst_inode_num == src_inode_num:
+            return  # Source and destination are the same file
+
+        if src_is_dir and self._is_same_or_descendant(dst_parent_num, src_inode_num):
+            raise OSError(f"Cannot move a directory into itself: {src}")
+
+        if dst_inode_num is not None:
+            # Replace existing destination, as rename(2) does
+            dst_inode = self._get_inode(dst_inode_num)
+            dst_is_dir = (dst_inode.mode & S_IFMT) == S_IFDIR
+            if dst_is_dir and not src_is_dir:
+                raise IsADirectoryError(f"Is a directory: {dst_name}")
+            if src_is_dir and not dst_is_dir:
+                raise NotADirectoryError(f"Not a directory: {dst_name}")
+            if dst_is_dir:
+                self._remove_empty_directory(dst_parent_num, dst_name, dst_inode_num, dst_inode)
+            else:
+                self._unlink_by_parent_inode(dst_parent_num, dst_name, dst_inode_num, dst_inode)
+
+        if src_is_dir:
+            file_type = 2
+        elif (src_inode.mode & S_IFMT) == S_IFLNK:
+            file_type = 7
+        else:
+            file_type = 1
+        self._add_directory_entry(dst_parent_num, dst_name, src_inode_num, file_type)
+        self._remove_directory_entry(src_parent_num, src_name)
+
+        if src_is_dir and src_parent_num != dst_parent_num:
+            # ".." переезжает к новому родителю вместе со ссылкой на него
+            self._set_dotdot(src_inode_num, src_inode, dst_parent_num)
+            src_parent = self._get_inode(src_parent_num)
+            src_parent.links_count -= 1
+            self._write_inode(src_parent_num, src_parent)
+            dst_parent = self._get_inode(dst_parent_num)
+            dst_parent.links_count += 1
+            self._write_inode(dst_parent_num, dst_parent)
+
+    def _is_same_or_descendant(self, dir_inode_num: int, ancestor_inode_num: int) -> bool:
+        """Check whether dir_inode_num is ancestor_inode_num or lies below it, following '..' up to the root"""
+        current = dir_inode_num
+        while True:
+            if current == ancestor_inode_num:
+                return True
+            if current == ROOT_INODE:
+                return False
+            parent = self._lookup_dentry(current, self._get_inode(current), "..")
+            if parent is None or parent == current:
+                return False
+            current = parent
+
+    def _set_dotdot(self, dir_inode_num: int, dir_inode: Inode, parent_inode_num: int):
+        """Point the '..' entry of a directory at a new parent"""
+        for entry, offset, physical_block in self._traverse_directory(dir_inode):
+            if entry and entry.name == "..":
+                self.image_file.seek(physical_block * BLOCK_SIZE + offset)
+                self.image_file.write(struct.pack("<I", parent_inode_num))
+                break
+        cached = self._dentry_cache.get(dir_inode_num)
+        if cached is not None and ".." in cached:
+            cached[".."] = parent_inode_num
+
+    def _remove_empty_directory(self, parent_inode_num: int, name: str, dir_inode_num: int, dir_inode: Inode):
+        """Remove an empty directory entry from an already resolved parent and free it"""
+        # Check if directory is empty (only . and .. entries)
+        for entry, _, _ in self._traverse_directory(dir_inode):
+            if entry and entry.name not in (".", ".."):
+                raise OSError("Directory not empty")
+
+        self._remove_directory_entry(parent_inode_num, name)
+        self._free_inode_blocks(dir_inode)
+        self._free_inode(dir_inode_num)
+        # Decrease parent links count
+        parent_inode = self._get_inode(parent_inode_num)
+        parent_inode.links_count -= 1
+        self._write_inode(parent_inode_num, parent_inode)
+
     def rmdir(self, path: str):
         """Remove empty directory"""
         if path == "/":
@@ -1198,15 +1856,6 @@ class FileSystem:
         if not ((dir_inode.mode & S_IFMT) == S_IFDIR):
             raise OSError("Not a directory")
 
-        # Check if directory is empty (only . and .. entries)
-        entry_count = 0
-        for entry, _, _ in self._traverse_directory(dir_inode):
-            if entry and entry.name not in [".", ".."]:
-                entry_count += 1
-
-        if entry_count > 0:
-            raise OSError("Directory not empty")
-
         # Get parent directory
         parent_path = posixpath.dirname(path)
         dirname = posixpath.basename(path)
@@ -1215,17 +1864,7 @@ class FileSystem:
             parent_path = "/"
 
         parent_inode_num = self._resolve_path(parent_path)
-        parent_inode = self._get_inode(parent_inode_num)
-
-        # Remove from parent directory
-        self._remove_directory_entry(parent_inode_num, dirname)
-        # Free blocks
-        self._free_inode_blocks(dir_inode)
-        # Free inode
-        self._free_inode(dir_inode_num)
-        # Decrease parent links count
-        parent_inode.links_count -= 1
-        self._write_inode(parent_inode_num, parent_inode)
+        self._remove_empty_directory(parent_inode_num, dirname, dir_inode_num, dir_inode)
 
     def _unlink_by_parent_inode(self, parent_inode_num: int, name: str, inode_num: int, inode: Inode):
         """Unlink file by parent inode number and name"""
@@ -1302,6 +1941,33 @@ class FileSystem:
 
     def readdir(self, path: str) -> List[str]:
         """List directory contents"""
+        return list(self.opendir(path))
+
+    def opendir(self, path: str) -> Iterator[str]:
+        """Iterate over directory entry names, reading the directory one block at a time"""
+        dir_inode_num = self._resolve_path(path)
+        dir_inode = self._get_inode(dir_inode_num)
+
+        if not ((dir_inode.mode & S_IFMT) == S_IFDIR):
+            raise OSError("Not a directory")
+
+        # Ошибки пути выше поднимаются сразу, сами имена отдаются лениво
+        return (
+            entry.name
+            for entry, _, _ in self._traverse_directory(dir_inode)
+            if entry and entry.inode_num != 0 and entry.name not in (".", "..")
+        )
+
+    def exists(self, path: str) -> bool:
+        """Check whether path resolves to an entry, without listing its directory"""
+        try:
+            self._resolve_path(path)
+        except OSError:
+            return False  # нет такого имени или компонент пути не каталог
+        return True
+
+    def readdir_typed(self, path: str) -> List[Tuple[str, int]]:
+        """List directory contents as (name, file_type) pairs taken from the entries themselves"""
         dir_inode_num = self._resolve_path(path)
         dir_inode = self._get_inode(dir_inode_num)
 
@@ -1311,14 +1977,31 @@ class FileSystem:
         entries = []
         for entry, _, _ in self._traverse_directory(dir_inode):
             if entry and entry.inode_num != 0 and entry.name not in [".", ".."]:
-                entries.append(entry.name)
+                entries.append((entry.name, entry.file_type))
         return entries
 
-    def stat(self, path: str) -> Dict[str, Union[int, str]]:
-        """Get file/directory metadata"""
-        inode_num = self._resolve_path(path)
-        inode = self._get_inode(inode_num)
+    def readdirplus(self, path: str) -> List[Tuple[str, Dict[str, Union[int, str]]]]:
+        """List directory contents together with lstat-style metadata of each entry"""
+        dir_inode_num = self._resolve_path(path)
+        dir_inode = self._get_inode(dir_inode_num)
+
+        if not ((dir_inode.mode & S_IFMT) == S_IFDIR):
+            raise OSError("Not a directory")
 
+        dirents = []
+        for entry, _, _ in self._traverse_directory(dir_inode):
+            if entry and entry.inode_num != 0 and entry.name not in [".", ".."]:
+                dirents.append((entry.name, entry.inode_num))
+
+        # Все иноды читаем пачкой: один read на каждый непрерывный участок таблицы
+        inodes = self._get_inodes_bulk([inode_num for _, inode_num in dirents])
+        return [
+            (name, self._stat_inode(inode_num, inode))
+            for (name, inode_num), inode in zip(dirents, inodes)
+        ]
+
+    def _stat_inode(self, inode_num: int, inode: Inode) -> Dict[str, Union[int, str]]:
+        """Build metadata dictionary for an already loaded inode"""
         file_size = inode.size_lo | (inode.size_high << 32)
 
         return {
@@ -1334,28 +2017,19 @@ class FileSystem:
             "type": inode.mode & S_IFMT,
         }
 
+    def stat(self, path: str) -> Dict[str, Union[int, str]]:
+        """Get file/directory metadata"""
+        inode_num = self._resolve_path(path)
+        return self._stat_inode(inode_num, self._get_inode(inode_num))
+
     def lstat(self, path: str) -> Dict[str, Union[int, str]]:
         """Get file/directory metadata without following symlinks"""
         inode_num = self._resolve_path(path, follow_links=False)
-        inode = self._get_inode(inode_num)
-
-        file_size = inode.size_lo | (inode.size_high << 32)
-
-        return {
-            "inode": inode_num,
-            "mode": inode.mode,
-            "size": file_size,
-            "uid": inode.uid,
-            "gid": inode.gid,
-            "atime": inode.atime,
-            "ctime": inode.ctime,
-            "mtime": inode.mtime,
-            "links_count": inode.links_count,
-            "type": inode.mode & S_IFMT,
-        }
+        return self._stat_inode(inode_num, self._get_inode(inode_num))
 
     def close_filesystem(self):
         """Close filesystem"""
+        self._inode_cache.clear()
         if self.image_file:
             self.image_file.close()
             self.image_file = None
@@ -1388,6 +2062,10 @@ class FileSystem:
             self.image_file.seek(physical_block * BLOCK_SIZE)
             block_data = self.image_file.read(BLOCK_SIZE)
 
+            # Следующий блок того же экстента читается, пока разбираем текущий
+            if block_offset_in_extent + 1 < leaf.block_count and bytes_scanned + BLOCK_SIZE < file_size:
+                self._prefetch_blocks((physical_block + 1,))
+
             offset = 0
             while offset < len(block_data):
                 try:
@@ -1785,6 +2463,13 @@ def init_filesystem(image_path: str) -> FileSystem:
     return _fs_instance
 
 
+def init_filesystem_memory(image_data: bytes) -> FileSystem:
+    """Initialize filesystem over an in-memory copy of an image"""
+    global _fs_instance
+    _fs_instance = FileSystem(":memory:", io.BytesIO(image_data))
+    return _fs_instance
+
+
 def get_filesystem() -> FileSystem:
     """Get current filesystem instance"""
     if _fs_instance is None:
@@ -1797,14 +2482,41 @@ def openf(path: str, flags: int = O_RDONLY, mode: int = 0o644) -> int:
     return get_filesystem().open(path, flags, mode)
 
 
+def open_inode(inode_num: int, flags: int = O_RDONLY) -> int:
+    return get_filesystem().open_inode(inode_num, flags)
+
+
 def read(fd: int, size: int, offset: Optional[int] = None) -> bytes:
     return get_filesystem().read(fd, size, offset)
 
+def readinto(fd: int, buffer: Union[bytearray, memoryview], offset: Optional[int] = None) -> int:
+    return get_filesystem().readinto(fd, buffer, offset)
+
+def read_file(path: str, max_bytes: Optional[int] = None) -> bytes:
+    return get_filesystem().read_file(path, max_bytes)
+
+def write_file(path: str, data: Union[bytes, bytearray, memoryview], truncate: bool = True) -> int:
+    return get_filesystem().write_file(path, data, truncate)
+
 
-def write(fd: int, data: bytes, offset: Optional[int] = None) -> int:
+def write(fd: int, data: Union[bytes, bytearray, memoryview], offset: Optional[int] = None) -> int:
     return get_filesystem().write(fd, data, offset)
 
 
+def create_many(
+    parent_path: str, entries: List[Tuple[str, Union[bytes, bytearray, memoryview]]], mode: int = 0o644
+) -> List[int]:
+    return get_filesystem().create_many(parent_path, entries, mode)
+
+
+def pwrite_many(fd: int, io_vec: List[Tuple[int, Union[bytes, bytearray, memoryview]]]) -> int:
+    return get_filesystem().pwrite_many(fd, io_vec)
+
+
+def fallocate(fd: int, length: int) -> int:
+    return get_filesystem().fallocate(fd, length)
+
+
 def close(fd: int):
     return get_filesystem().close(fd)
 
@@ -1813,10 +2525,22 @@ def unlink(path: str):
     return get_filesystem().unlink(path)
 
 
+def unlink_many(paths: List[str]):
+    return get_filesystem().unlink_many(paths)
+
+
 def mkdir(path: str, mode: int = 0o755):
     return get_filesystem().mkdir(path, mode)
 
 
+def mkdirs(path: str, mode: int = 0o755):
+    return get_filesystem().mkdirs(path, mode)
+
+
+def rename(src: str, dst: str):
+    return get_filesystem().rename(src, dst)
+
+
 def rmdir(path: str):
     return get_filesystem().rmdir(path)
 
@@ -1825,9 +2549,70 @@ def readdir(path: str) -> List[str]:
     return get_filesystem().readdir(path)
 
 
+def opendir(path: str) -> Iterator[str]:
+    return get_filesystem().opendir(path)
+
+
+def exists(path: str) -> bool:
+    return get_filesystem().exists(path)
+
+
+def readdir_typed(path: str) -> List[Tuple[str, int]]:
+    return get_filesystem().readdir_typed(path)
+
+
+def readdirplus(path: str) -> List[Tuple[str, Dict[str, Union[int, str]]]]:
+    return get_filesystem().readdirplus(path)
+
+
 def stat(path: str) -> Dict[str, Union[int, str]]:
     return get_filesystem().stat(path)
 
 
 def lstat(path: str) -> Dict[str, Union[int, str]]:
     return get_filesystem().lstat(path)
+
+
+class BufferedWriter:
+    """
+    Coalesces consecutive writes to a descriptor into fewer fsapi.write calls.
+    Data is written on flush(), when the buffer fills up, on a jump to a
+    non-adjacent offset and when leaving the with block.
+    """
+
+    def __init__(self, fd: int, bufsize: int = BLOCK_SIZE * 8):
+        self.fd = fd
+        self.bufsize = bufsize
+        self._buffer = bytearray()
+        # Смещение начала буфера; None - текущая позиция дескриптора
+        self._start: Optional[int] = None
+
+    def write(self, data: Union[bytes, bytearray, memoryview], offset: Optional[int] = None) -> int:
+        if self._buffer:
+            if offset is None:
+                adjacent = self._start is None
+            else:
+                adjacent = self._start is not None and offset == self._start + len(self._buffer)
+            if not adjacent:
+                self.flush()
+        if not self._buffer:
+            self._start = offset
+            if len(data) >= self.bufsize:
+                # Крупный кусок нет смысла копировать в буфер
+                return write(self.fd, data, offset)
+
+        self._buffer += data
+        if len(self._buffer) >= self.bufsize:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        if self._buffer:
+            buffer, self._buffer = self._buffer, bytearray()
+            write(self.fd, buffer, self._start)
+
+    def __enter__(self) -> "BufferedWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
@@ -1,5 +1,7 @@
+import io
 import os
 import struct
+from typing import BinaryIO, Union
 from fs import INODE_SIZE, Superblock, GroupDesc, Inode
 from fsapi import BLOCK_SIZE, BLOCKS_PER_GROUP, INODES_PER_GROUP
 
@@ -12,12 +14,30 @@ def create_empty_image(image_path: str, size_mb: int = 8):
     # print(f"Created empty image {image_path} ({size_mb}MB)")
 
 
-def mkfs(image_path: str):
-    """Initialize ext4-like filesystem in the image file"""
-    if not os.path.exists(image_path):
-        create_empty_image(image_path)
+def mkfs(image: Union[str, BinaryIO]):
+    """Initialize ext4-like filesystem in the image file (a path or an open binary file)"""
+    if not isinstance(image, (str, os.PathLike)):
+        # Уже открытый файл, например io.BytesIO: размер берём по его концу
+        size = image.seek(0, os.SEEK_END)
+        _format_image(image, size)
+        return
 
-    size = os.path.getsize(image_path)
+    if not os.path.exists(image):
+        create_empty_image(image)
+
+    with open(image, "r+b") as f:
+        _format_image(f, os.path.getsize(image))
+
+
+def mkfs_to_bytes(size_mb: int = 8) -> bytes:
+    """Build a formatted image entirely in memory"""
+    image = io.BytesIO(bytes(size_mb * 1024 * 1024))
+    mkfs(image)
+    return image.getvalue()
+
+
+def _format_image(f: BinaryIO, size: int):
+    """Write superblock, block groups and the root directory into an image of size bytes"""
     block_count = size // BLOCK_SIZE
     num_groups = (block_count + BLOCKS_PER_GROUP - 1) // BLOCKS_PER_GROUP
     total_inodes = num_groups * INODES_PER_GROUP
@@ -29,17 +49,16 @@ def mkfs(image_path: str):
     # print(f"  Block groups: {num_groups}")
     # print(f"  Total inodes: {total_inodes}")
 
-    with open(image_path, "r+b") as f:
-        # Step 1: Create and write superblock
-        create_superblock(f, block_count, num_groups, total_inodes)
+    # Step 1: Create and write superblock
+    create_superblock(f, block_count, num_groups, total_inodes)
 
-        # Step 2: Create block groups
-        create_block_groups(f, num_groups, block_count)
+    # Step 2: Create block groups
+    create_block_groups(f, num_groups, block_count)
 
-        # Step 3: Create root inode
-        create_root_inode(f)
+    # Step 3: Create root inode
+    create_root_inode(f)
 
-        # print("Filesystem initialized successfully!")
+    # print("Filesystem initialized successfully!")
 
 
 def create_superblock(f, block_count: int, num_groups: int, total_inodes: int):
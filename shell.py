@@ -1,23 +1,82 @@
 # imfrom fsapi import init_filesystem, get_filesystem, O_RDONLY, O_WRONLY, O_CREAT, O_TRUNC, S_IFDIR, S_IFREG, S_IFLNK, S_IFIFO, S_IFCHR, S_IFBLK, S_IFSOCK, BLOCK_SIZE, Inode, ExtentHeader, ExtentLeafort os
+import io
 import posixpath
 import sys
 import time
+from functools import lru_cache
 from fsapi import S_IFMT, init_filesystem, get_filesystem, O_RDONLY, O_WRONLY, O_CREAT, O_TRUNC, S_IFDIR, S_IFREG, S_IFLNK, S_IFIFO, S_IFCHR, S_IFBLK, S_IFSOCK, BLOCK_SIZE, Inode, ExtentHeader, ExtentLeaf
 from rich import print
-import random
+import os
 import string
-commands = []
+
+try:
+    import readline  # включает историю и редактирование строки в input()
+except ImportError:
+    readline = None
+commands: dict[str, dict] = {}
+
+# rwx-строки для каждого 3-битного поля прав доступа
+_RWX = ('---', '--x', '-w-', '-wx', 'r--', 'r-x', 'rw-', 'rwx')
+# Строка прав для каждого значения mode & 0o777
+_PERM = tuple(_RWX[m >> 6] + _RWX[(m >> 3) & 7] + _RWX[m & 7] for m in range(0o1000))
+
+_TYPE_CHAR = {
+    S_IFDIR: 'd',
+    S_IFLNK: 'l',
+    S_IFREG: '-',
+    S_IFCHR: 'c',
+    S_IFBLK: 'b',
+    S_IFIFO: 'p',
+    S_IFSOCK: 's'
+}
+
+_UNITS = ('B', 'K', 'M', 'G')
+
+_SIZE_SUFFIX = {'B': 1, 'K': 1024, 'M': 1024 * 1024, 'G': 1024 * 1024 * 1024}
+
+# Заголовок дерева экстентов симлинка с одним листом всегда одинаков
+_SYMLINK_EXTENT_HEADER = ExtentHeader(magic=0xF30A, entries_count=1, max_entries=3, depth=0).pack()
+
+# ANSI-коды приглашения: выводим их напрямую, минуя разбор разметки rich
+if sys.stdout.isatty():
+    # Приглашение выводит readline: \001...\002 отмечают невидимые символы,
+    # иначе он неверно считает ширину строки и портит её при перерисовке
+    _INVISIBLE_START, _INVISIBLE_END = (
+        ("\001", "\002") if readline is not None and sys.stdin.isatty() else ("", "")
+    )
+    _BOLD_CYAN = f"{_INVISIBLE_START}\x1b[1;36m{_INVISIBLE_END}"
+    _BOLD_WHITE = f"{_INVISIBLE_START}\x1b[1;37m{_INVISIBLE_END}"
+    _RESET = f"{_INVISIBLE_START}\x1b[0m{_INVISIBLE_END}"
+else:
+    _BOLD_CYAN = _BOLD_WHITE = _RESET = ""
+
+_TYPE_NAMES = {
+    S_IFDIR: "directory",
+    S_IFLNK: "symbolic link",
+    S_IFREG: "regular file",
+    S_IFIFO: "fifo",
+    S_IFCHR: "character device",
+    S_IFBLK: "block device",
+    S_IFSOCK: "socket",
+}
+
+# Таблица перевода случайного байта в печатный ASCII-символ для rndfile.
+# Байты из "хвоста" выше кратного длине алфавита удаляются, чтобы не было смещения.
+_RND_ALPHABET = (string.ascii_letters + string.digits + string.punctuation + ' ').encode('ascii')
+_RND_LIMIT = 256 // len(_RND_ALPHABET) * len(_RND_ALPHABET)
+_RND_TABLE = (_RND_ALPHABET * (256 // len(_RND_ALPHABET) + 1))[:256]
+_RND_REJECT = bytes(range(_RND_LIMIT, 256))
 
 def command(name, description):
     def decorator(func):
-        commands.append({'name': name, 'func': func, 'description': description})
+        commands[name] = {'func': func, 'description': description}
         return func
     return decorator
 
 def handle_help(args, cwd):
     print("Available commands:")
-    for cmd in sorted(commands, key=lambda x: x['name']):
-        print(f"  {cmd['name']}: {cmd['description']}")
+    for name, cmd in sorted(commands.items()):
+        print(f"  {name}: {cmd['description']}")
 
 @command('help', 'Show available commands')
 def handle_help_decorated(args, cwd):
@@ -38,24 +97,39 @@ def main():
 
     cwd = "/"
 
+    if readline is not None:
+        matches = []
+
+        def complete(text, state):
+            # Первое слово - имя команды, остальные - пути относительно cwd
+            if state == 0:
+                if ' ' in readline.get_line_buffer().lstrip():
+                    matches[:] = _complete_path(text, cwd)
+                else:
+                    matches[:] = sorted(name + ' ' for name in commands if name.startswith(text))
+            return matches[state] if state < len(matches) else None
+
+        readline.set_completer_delims(' \t\n')
+        readline.set_completer(complete)
+        readline.parse_and_bind('tab: complete')
+
     while True:
         try:
-            prompt = f"[bold cyan]{cwd}[/bold cyan][bold white]>[/bold white] "
-            print(prompt, end="")
-            cmd = input().strip()
+            cmd = input(f"{_BOLD_CYAN}{cwd}{_RESET}{_BOLD_WHITE}>{_RESET} ").strip()
             if not cmd:
                 continue
 
-            parts = cmd.split()
-            command_name = parts[0].lower()
-            args = parts[1:]
+            # Отделяем только имя команды; аргументы разбираем, если команда найдена
+            head, *rest = cmd.split(None, 1)
+            command_name = head.lower()
 
             if command_name == "exit" or command_name == "quit":
                 break
 
-            # Find command in list
-            cmd_entry = next((c for c in commands if c['name'] == command_name), None)
+            # Find command in dispatch table
+            cmd_entry = commands.get(command_name)
             if cmd_entry:
+                args = rest[0].split() if rest else []
                 try:
                     result = cmd_entry['func'](args, cwd)
                     if result is not None:
@@ -71,6 +145,49 @@ def main():
         except Exception as e:
             print(f"Error: {e}")
 
+def _format_size(size):
+    """Human readable size: unit index comes from the bit length (one unit per 10 bits)"""
+    bl = size.bit_length()
+    idx = 0 if bl <= 10 else min((bl - 1) // 10, 3)
+    if idx == 0:
+        return f"{size}B"
+    return f"{size / (1 << (idx * 10)):.1f}{_UNITS[idx]}"
+
+def _complete_path(text, cwd):
+    """Names in the directory named by text that extend its last component; dirs end in '/'"""
+    dirname, sep, partial = text.rpartition('/')
+    base = resolve_path(dirname or sep, cwd)
+    prefix = dirname + sep
+    try:
+        entries = get_filesystem().readdir_typed(base)
+    except Exception:
+        return []
+    return sorted(
+        prefix + name + ('/' if file_type == 2 else '')
+        for name, file_type in entries if name.startswith(partial)
+    )
+
+def _random_printable(n):
+    """Return a bytearray of n uniformly distributed printable ASCII bytes"""
+    # Байты >= _RND_LIMIT отбрасываются (~26%): берём с запасом сразу, добор почти не нужен
+    draw = n * 256 // _RND_LIMIT + n // 64 + 64
+    out = bytearray(os.urandom(draw).translate(_RND_TABLE, _RND_REJECT))
+    while len(out) < n:
+        out += os.urandom(n - len(out) + 64).translate(_RND_TABLE, _RND_REJECT)
+    del out[n:]
+    return out
+
+def _copy_fd(fs, fd_src, fd_dst, total, chunk=16 * BLOCK_SIZE):
+    """Copy total bytes between descriptors in block-aligned chunks"""
+    left = total
+    while left > 0:
+        buf = fs.read(fd_src, min(chunk, left))
+        if not buf:
+            break
+        fs.write(fd_dst, buf)
+        left -= len(buf)
+
+@lru_cache(maxsize=256)
 def resolve_path(path, cwd):
     if not path:
         return cwd
@@ -92,21 +209,24 @@ def handle_ls(args, cwd):
     else:
         path = cwd
     try:
-        entries = fs.readdir(path)
-        # for entry in sorted(entries):
-        #     print(entry)
         formatted = []
-        for entry in sorted(entries):
+        prefix = path if path.endswith('/') else path + '/'
+        # Тип берём из записи каталога (2 - каталог, 7 - симлинк), иноды не читаем
+        for entry, file_type in sorted(fs.readdir_typed(path)):
             try:
-                st = fs.stat(posixpath.join(path, entry))
-                if st["type"] & S_IFDIR:
+                if file_type == 7:
+                    # Цвет симлинка определяется его целью
+                    is_dir = fs.stat(prefix + entry)["type"] & S_IFDIR
+                else:
+                    is_dir = file_type == 2
+                if is_dir:
                     formatted.append(f"[bold blue]{entry}[/bold blue]")
                 else:
                     formatted.append(entry)
             except FileNotFoundError:
                 formatted.append(entry)  # Показываем имя, даже если файл «сломанный»
 
-        print(*formatted, sep=" ")
+        print(" ".join(formatted))
     except Exception as e:
         print(f"ls: {e}")
 
@@ -118,19 +238,15 @@ def handle_lsd(args, cwd):
     else:
         path = cwd
     try:
-        entries = fs.readdir(path)
-        all_entries = sorted(entries)
+        all_entries = sorted(fs.readdirplus(path), key=lambda e: e[0])
 
-        # Print table header
-        print("Inode  Mode       Links  Uid  Gid    Size Name")
-        print("-" * 60)
+        # Собираем всю таблицу и выводим одним вызовом print
+        buf = io.StringIO()
+        buf.write("Inode  Mode       Links  Uid  Gid    Size Name\n")
+        buf.write("-" * 60 + "\n")
 
-        for entry in all_entries:
+        for entry, stat_info in all_entries:
             try:
-                # Get all information through one stat call
-                entry_path = posixpath.join(path, entry)
-                stat_info = fs.lstat(entry_path)
-                
                 inode_num = stat_info['inode']
                 mode = stat_info['mode']
                 links_count = stat_info['links_count']
@@ -140,30 +256,13 @@ def handle_lsd(args, cwd):
 
                 # File type and permissions
                 file_type = mode & S_IFMT  # Extract file type bits
-                type_char = {
-                    S_IFDIR: 'd',
-                    S_IFLNK: 'l',
-                    S_IFREG: '-',
-                    S_IFCHR: 'c',
-                    S_IFBLK: 'b',
-                    S_IFIFO: 'p',
-                    S_IFSOCK: 's'
-                }.get(file_type, '?')
+                type_char = _TYPE_CHAR.get(file_type, '?')
 
                 # Convert to proper rwx format
-                owner_perms = f"{'r' if mode & 0o400 else '-'}{'w' if mode & 0o200 else '-'}{'x' if mode & 0o100 else '-'}"
-                group_perms = f"{'r' if mode & 0o040 else '-'}{'w' if mode & 0o020 else '-'}{'x' if mode & 0o010 else '-'}"
-                other_perms = f"{'r' if mode & 0o004 else '-'}{'w' if mode & 0o002 else '-'}{'x' if mode & 0o001 else '-'}"
+                perms = _PERM[mode & 0o777]
 
                 # Human readable size
-                if size < 1024:
-                    size_str = f"{size}B"
-                elif size < 1024 * 1024:
-                    size_str = f"{size / 1024:.1f}K"
-                elif size < 1024 * 1024 * 1024:
-                    size_str = f"{size / (1024 * 1024):.1f}M"
-                else:
-                    size_str = f"{size / (1024 * 1024 * 1024):.1f}G"
+                size_str = _format_size(size)
 
                 # Format entry name with color
                 if file_type & S_IFDIR:
@@ -171,10 +270,12 @@ def handle_lsd(args, cwd):
                 else:
                     entry_display = entry
 
-                print(f"{inode_num:5d} {type_char}{owner_perms}{group_perms}{other_perms} {links_count:3d} {uid:4d} {gid:4d} {size_str:>7s} {entry_display}")
+                buf.write(f"{inode_num:5d} {type_char}{perms} {links_count:3d} {uid:4d} {gid:4d} {size_str:>7s} {entry_display}\n")
 
             except Exception as e:
-                print(f"lsd: error reading {entry}: {e}")
+                buf.write(f"lsd: error reading {entry}: {e}\n")
+
+        print(buf.getvalue(), end="")
 
     except Exception as e:
         print(f"lsd: {e}")
@@ -257,21 +358,18 @@ def handle_cat(args, cwd):
         if not (stat_info["type"] & (S_IFREG | S_IFLNK)):
             print("cat: Is not a regular file or symlink")
             return
-        fd = fs.open(path, O_RDONLY)
 
         # Read up to 2000 bytes
-        read_size = min(2000, stat_info["size"])
-        data = fs.read(fd, read_size)
-        content = data.decode('utf-8', errors='ignore')
+        data = fs.read_file(path, 2000)
+
+        # Сырые байты идут в терминал напрямую, без декодирования и разметки rich
+        sys.stdout.flush()
+        sys.stdout.buffer.write(data + b"\n")
+        sys.stdout.buffer.flush()
 
         # Truncate if needed and add indication
         if stat_info["size"] > 2000:
-            print(content)
             print(f"... [truncated, showing first 2000 bytes of {stat_info['size']} total]")
-        else:
-            print(content)
-
-        fs.close(fd)
     except Exception as e:
         print(f"cat: {e}")
 
@@ -303,15 +401,20 @@ def handle_cp(args, cwd):
             print("cp: directories not supported yet")
             return
 
-        # Read source file
-        fd_src = fs.open(src_path, O_RDONLY)
-        data = fs.read(fd_src, src_stat["size"])
-        fs.close(fd_src)
+        # Streaming would truncate the source before reading it
+        try:
+            if fs.stat(dst_path)["inode"] == src_stat["inode"]:
+                print(f"cp: {src_path} and {dst_path} are the same file")
+                return
+        except FileNotFoundError:
+            pass
 
-        # Write to destination
+        # Stream source file into destination
+        fd_src = fs.open(src_path, O_RDONLY)
         fd_dst = fs.open(dst_path, O_CREAT | O_WRONLY | O_TRUNC)
-        fs.write(fd_dst, data)
+        _copy_fd(fs, fd_src, fd_dst, src_stat["size"])
         fs.close(fd_dst)
+        fs.close(fd_src)
     except Exception as e:
         print(f"cp: {e}")
 
@@ -333,25 +436,9 @@ def handle_mv(args, cwd):
                 dst_path = dst_raw
         except FileNotFoundError:
             dst_path = dst_raw
-        # Copy + delete implementation
-        # Check if source exists
-        src_stat = fs.stat(src_path)
-        if src_stat["mode"] & S_IFDIR:
-            print("mv: directories not supported yet")
-            return
 
-        # Read source file
-        fd_src = fs.open(src_path, O_RDONLY)
-        data = fs.read(fd_src, src_stat["size"])
-        fs.close(fd_src)
-
-        # Write to destination
-        fd_dst = fs.open(dst_path, O_CREAT | O_WRONLY | O_TRUNC)
-        fs.write(fd_dst, data)
-        fs.close(fd_dst)
-
-        # Remove source
-        fs.unlink(src_path)
+        # Rewrite directory entries only; data blocks stay in place
+        fs.rename(src_path, dst_path)
     except Exception as e:
         print(f"mv: {e}")
 
@@ -383,9 +470,7 @@ def handle_echo(args, cwd):
         try:
             text = ' '.join(text_args) + '\n'
             # Truncate or create file without unlink
-            fd = fs.open(file_path, O_CREAT | O_WRONLY | O_TRUNC)
-            fs.write(fd, text.encode('utf-8'))
-            fs.close(fd)
+            fs.write_file(file_path, text.encode('utf-8'))
         except Exception as e:
             print(f"echo: {e}")
     else:
@@ -409,8 +494,7 @@ def handle_chmod(args, cwd):
             return
 
         # Get current inode
-        inode_num = fs._resolve_path(path)
-        inode = fs._get_inode(inode_num)
+        inode_num, inode = fs._inode_by_path(path)
 
         # Update mode (preserve file type bits)
         inode.mode = (inode.mode & 0o170000) | (mode & 0o0777)
@@ -437,8 +521,7 @@ def handle_chown(args, cwd):
             return
 
         # Get current inode
-        inode_num = fs._resolve_path(path)
-        inode = fs._get_inode(inode_num)
+        inode_num, inode = fs._inode_by_path(path)
 
         # Update uid
         inode.uid = uid
@@ -494,36 +577,21 @@ def handle_ln(args, cwd):
     link_path = resolve_path(args[1], cwd)
 
     try:
-        # Check if link already exists
-        try:
-            fs.lstat(link_path)
-            print(f"ln: {link_path}: File exists")
-            return
-        except FileNotFoundError:
-            pass
-
-        # Prevent hard link to directory
-        target_stat = fs.stat(target_path)
-        if target_stat["mode"] & S_IFDIR:
+        # Get parent directory of link and check if link already exists
+        parent_inode_num, link_name, existing = fs._lookup_parent_and_check(link_path)
+        if existing is not None:
+            raise FileExistsError(f"{link_path}: File exists")
+
+        # Get target inode and prevent hard link to directory
+        target_inode_num, target_inode = fs._inode_by_path(target_path)
+        if target_inode.mode & S_IFDIR:
             print(f"ln: {target_path}: hard link not allowed for directory")
             return
-        # Get target inode
-        target_inode_num = fs._resolve_path(target_path)
-
-        # Get parent directory of link
-        link_parent = posixpath.dirname(link_path)
-        link_name = posixpath.basename(link_path)
-
-        if link_parent == "":
-            link_parent = "/"
-
-        parent_inode_num = fs._resolve_path(link_parent)
 
         # Add directory entry
         fs._add_directory_entry(parent_inode_num, link_name, target_inode_num, 1)
 
         # Increment link count
-        target_inode = fs._get_inode(target_inode_num)
         target_inode.links_count += 1
         fs._write_inode(target_inode_num, target_inode)
 
@@ -541,27 +609,18 @@ def handle_lns(args, cwd):
     link_path = resolve_path(args[1], cwd)
 
     try:
-        # Check if link already exists
-        try:
-            fs.lstat(link_path)
-            print(f"lns: {link_path}: File exists")
-            return
-        except FileNotFoundError:
-            pass
-
-        # Get parent directory of link
-        link_parent = posixpath.dirname(link_path)
-        link_name = posixpath.basename(link_path)
-
-        if link_parent == "":
-            link_parent = "/"
+        # Get parent directory of link and check if link already exists
+        parent_inode_num, link_name, existing = fs._lookup_parent_and_check(link_path)
+        if existing is not None:
+            raise FileExistsError(f"{link_path}: File exists")
 
-        parent_inode_num = fs._resolve_path(link_parent)
+        target_path_bytes = target_path.encode('utf-8')
+        size = len(target_path_bytes)
+        if size > BLOCK_SIZE:
+            raise OSError(f"{target_path}: File name too long")
 
         # Allocate inode for symlink
         inode_num = fs._allocate_inode()
-        target_path_bytes = target_path.encode('utf-8')
-        size = len(target_path_bytes)
 
         # Write symlink target directly into inode if it fits
         if size <= 48:  # Inline symlink (extent_root is 48 bytes)
@@ -584,14 +643,13 @@ def handle_lns(args, cwd):
             data_block = fs._allocate_block()
 
             # 2. Create extent tree with one entry
-            header = ExtentHeader(magic=0xF30A, entries_count=1, max_entries=3, depth=0)
             leaf = ExtentLeaf(
                 logical_block=0,
                 block_count=1,
                 start_block_hi=(data_block >> 32),
                 start_block_lo=(data_block & 0xFFFFFFFF)
             )
-            extent_root = header.pack() + leaf.pack() + b'\x00' * (48 - 12 - 8)
+            extent_root = _SYMLINK_EXTENT_HEADER + leaf.pack() + b'\x00' * (48 - 12 - 8)
 
             # 3. Create inode with ready extent_root
             inode = Inode(
@@ -609,9 +667,12 @@ def handle_lns(args, cwd):
             )
             fs._write_inode(inode_num, inode)
 
-            # 4. Manually write path to the allocated block
+            # 4. Manually write path to the allocated block, zero-padded to a full block
+            block = bytearray(BLOCK_SIZE)
+            block[:size] = target_path_bytes
             fs.image_file.seek(data_block * BLOCK_SIZE)
-            fs.image_file.write(target_path_bytes)
+            fs.image_file.write(block)
+            fs.image_file.flush()
 
         # 5. Add entry to parent directory
         fs._add_directory_entry(parent_inode_num, link_name, inode_num, 7)  # 7 for symlink
@@ -631,21 +692,17 @@ def handle_rndfile(args, cwd):
 
     # Parse size string (e.g., "10M", "1K", "500B")
     try:
-        if size_str.upper().endswith('B'):
-            size = int(size_str[:-1])
-        elif size_str.upper().endswith('K'):
-            size = int(size_str[:-1]) * 1024
-        elif size_str.upper().endswith('M'):
-            size = int(size_str[:-1]) * 1024 * 1024
-            if size > 150 * 1024 * 1024:
-                print("rndfile: too large")
-                return
-        elif size_str.upper().endswith('G'):
+        mult = _SIZE_SUFFIX.get(size_str[-1:].upper())
+        if mult is None:
+            size = int(size_str)
+        elif mult >= 1024 * 1024 * 1024:
             print("rndfile: too large")
             return
-            # size = int(size_str[:-1]) * 1024 * 1024 * 1024
         else:
-            size = int(size_str)
+            size = int(size_str[:-1]) * mult
+            if mult == 1024 * 1024 and size > 150 * 1024 * 1024:
+                print("rndfile: too large")
+                return
     except ValueError:
         print("rndfile: invalid size format")
         return
@@ -666,7 +723,7 @@ def handle_rndfile(args, cwd):
         fd = fs.open(file_path, O_CREAT | O_WRONLY | O_TRUNC)
 
         # Write random ASCII characters in chunks to avoid memory issues
-        chunk_size = min(1024 * 1024, size)  # 1MB chunks or smaller
+        chunk_size = min(8 * 1024 * 1024, size)  # 8MB chunks or smaller
         written = 0
 
         while written < size:
@@ -674,11 +731,8 @@ def handle_rndfile(args, cwd):
             current_chunk = min(chunk_size, remaining)
 
             # Generate random ASCII printable characters
-            random_chars = ''.join(random.choices(
-                string.ascii_letters + string.digits + string.punctuation + ' ',
-                k=current_chunk
-            ))
-            fs.write(fd, random_chars.encode('utf-8'))
+            random_chars = _random_printable(current_chunk)
+            fs.write(fd, random_chars)
             written += current_chunk
 
         fs.close(fd)
@@ -705,18 +759,9 @@ def handle_stat(args, cwd):
         mtime = stat_info['mtime']
         ctime = stat_info['ctime']
 
-        type_names = {
-            S_IFDIR: "directory",
-            S_IFLNK: "symbolic link",
-            S_IFREG: "regular file",
-            S_IFIFO: "fifo",
-            S_IFCHR: "character device",
-            S_IFBLK: "block device",
-            S_IFSOCK: "socket",
-        }
         print(f"  File: {path}")
         print(f"  Size: {stat_info['size']}\t\tBlocks: {(stat_info['size'] + 4095) // 4096}")
-        print(f"  Type: {type_names.get(stat_info['type'], 'unknown')}")
+        print(f"  Type: {_TYPE_NAMES.get(stat_info['type'], 'unknown')}")
         print(f"Inode: {inode_num}\t\tLinks: {links_count}")
         print(f"Access: ({mode & 0o777:04o})\t\tUid: {uid}\t\tGid: {gid}")
         print(f"Access: {atime}")
@@ -743,18 +788,9 @@ def handle_lstat(args, cwd):
         mtime = stat_info['mtime']
         ctime = stat_info['ctime']
 
-        type_names = {
-            S_IFDIR: "directory",
-            S_IFLNK: "symbolic link",
-            S_IFREG: "regular file",
-            S_IFIFO: "fifo",
-            S_IFCHR: "character device",
-            S_IFBLK: "block device",
-            S_IFSOCK: "socket",
-        }
         print(f"  File: {path}")
         print(f"  Size: {stat_info['size']}\t\tBlocks: {(stat_info['size'] + 4095) // 4096}")
-        print(f"  Type: {type_names.get(stat_info['type'], 'unknown')}")
+        print(f"  Type: {_TYPE_NAMES.get(stat_info['type'], 'unknown')}")
         print(f"Inode: {inode_num}\t\tLinks: {links_count}")
         print(f"Access: ({mode & 0o777:04o})\t\tUid: {uid}\t\tGid: {gid}")
         print(f"Access: {atime}")
@@ -3,12 +3,61 @@
 Test script for the filesystem API
 """
 
+import atexit
 import os
-from main import mkfs
+import shutil
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
+from main import mkfs, mkfs_to_bytes
 import fsapi
-from rich.console import Console
 
-console = Console()
+# Образы держим в tmpfs (память), если он есть: ввод-вывод тестов не доходит до диска
+IMAGE_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else "."
+
+# Строки результатов пишем сами, без разбора разметки rich (цвет только в терминале)
+if sys.stdout.isatty():
+    _BANNER, _YELLOW, _GREEN, _BOLD_RED, _RESET = "\x1b[1;37;44m", "\x1b[1;33m", "\x1b[32m", "\x1b[1;31m", "\x1b[0m"
+else:
+    _BANNER = _YELLOW = _GREEN = _BOLD_RED = _RESET = ""
+
+# PROTOEXT4_TEST_BACKEND=mem: образы тестов живут в памяти (io.BytesIO), а не в файлах
+MEMORY_BACKEND = os.environ.get("PROTOEXT4_TEST_BACKEND") == "mem"
+
+# Данные для теста многоблочного файла: bytes неизменяемы, один объект на весь прогон
+LARGE_DATA = b"A" * (fsapi.BLOCK_SIZE + 500)
+
+# Заполнители на блок: создаются один раз, тесты берут из них срезы memoryview без копий
+FILLER_A = memoryview(b"A" * fsapi.BLOCK_SIZE)
+ZEROS = memoryview(bytes(fsapi.BLOCK_SIZE))
+
+def _silent_remove(path):
+    """Удаляет файл, если он есть (один системный вызов вместо exists + remove)."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _copy_image(src, dst):
+    """Копирует образ внутри ядра (copy_file_range, reflink где поддерживается), иначе shutil."""
+    if not hasattr(os, "copy_file_range"):
+        shutil.copyfile(src, dst)
+        return
+    src_fd = os.open(src, os.O_RDONLY)
+    try:
+        dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            left = os.fstat(src_fd).st_size
+            while left > 0:
+                copied = os.copy_file_range(src_fd, dst_fd, left)
+                if copied == 0:
+                    raise OSError(f"copy_file_range stopped early copying {src}")
+                left -= copied
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
 
 class RaisesContext:
     def __init__(self, exc_type):
@@ -30,21 +79,79 @@ class RaisesContext:
 
 class TestCase:
     """Базовый класс для наших тестов с автоматической настройкой и очисткой."""
+    template_path = os.path.join(IMAGE_DIR, f"test_fs_template_{os.getpid()}.img")
+    _template_ready = False
+    _template_bytes = None
+    _test_methods: tuple = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Список тестов класса собираем один раз при его объявлении;
+        # только методы самого класса (базовый TestCase тестов не содержит)
+        cls._test_methods = tuple(sorted(
+            name for name, value in vars(cls).items()
+            if name.startswith("test_") and callable(value)
+        ))
+
+    @classmethod
+    def setUpClass(cls):
+        """Выполняется один раз перед тестами класса: форматирует образ-шаблон на весь прогон."""
+        if TestCase._template_ready:
+            return
+        if MEMORY_BACKEND:
+            # Шаблон форматируется прямо в памяти, файл не нужен
+            TestCase._template_bytes = mkfs_to_bytes()
+        else:
+            _silent_remove(TestCase.template_path)
+            mkfs(TestCase.template_path)
+            atexit.register(_silent_remove, TestCase.template_path)
+        TestCase._template_ready = True
+
+    @classmethod
+    def tearDownClass(cls):
+        """Выполняется один раз после тестов класса."""
+
     def setUp(self):
         """Выполняется перед каждым тестом."""
-        self.image_path = "test_fs.img"
-        if os.path.exists(self.image_path):
-            os.remove(self.image_path)
-        mkfs(self.image_path)
+        if MEMORY_BACKEND:
+            self.image_path = None
+            if TestCase._template_bytes is None:
+                TestCase._template_bytes = mkfs_to_bytes()
+            self.fs = fsapi.init_filesystem_memory(TestCase._template_bytes)
+            return
+        self.image_path = os.path.join(IMAGE_DIR, f"test_fs_{os.getpid()}.img")
+        # Копия готового шаблона вместо mkfs
+        _copy_image(self.template_path, self.image_path)
         self.fs = fsapi.init_filesystem(self.image_path)
 
     def tearDown(self):
         """Выполняется после каждого теста."""
         self.fs.close_filesystem()
-        if os.path.exists(self.image_path):
-            os.remove(self.image_path)
+        if self.image_path is not None:
+            _silent_remove(self.image_path)
+
+    def _remount(self):
+        """Переоткрывает образ, чтобы иноды читались с диска, а не из кэша."""
+        if self.image_path is None:
+            image_data = self.fs.image_file.getvalue()
+            self.fs.close_filesystem()
+            self.fs = fsapi.init_filesystem_memory(image_data)
+        else:
+            self.fs.close_filesystem()
+            self.fs = fsapi.init_filesystem(self.image_path)
+
+    def _write_then_read(self, path, data, flags=fsapi.O_CREAT | fsapi.O_RDWR):
+        """Пишет data через один дескриптор и читает её обратно с нулевого смещения."""
+        fd = fsapi.openf(path, flags)
+        try:
+            self.assertEqual(fsapi.write(fd, data), len(data))
+            return fsapi.read(fd, len(data) + 100, offset=0)
+        finally:
+            fsapi.close(fd)
 
     def assertEqual(self, a, b, msg=""):
+        if a is b:
+            return  # один и тот же объект (None, True, маленькие int) - сравнивать нечего
         # limit if str to 10 symbols
         if isinstance(a, str | bytes) and isinstance(b, str | bytes):
             a = a[:10]
@@ -52,6 +159,15 @@ class TestCase:
         if a != b:
             raise AssertionError(f"{msg} | {a!r} != {b!r}")
 
+    def assertSetEqual(self, a, b, msg=""):
+        """Сравнивает коллекции без учёта порядка; повторы в a тоже считаются ошибкой."""
+        a_list = list(a)
+        a_set, b_set = set(a_list), set(b)
+        if a_set != b_set:
+            raise AssertionError(f"{msg} | missing={b_set - a_set!r} extra={a_set - b_set!r}")
+        if len(a_list) != len(a_set):
+            raise AssertionError(f"{msg} | duplicate entries in {a_list!r}")
+
     def assertTrue(self, x, msg=""):
         if not x:
             raise AssertionError(f"{msg} | Expression is not True")
@@ -74,37 +190,80 @@ class TestCase:
                 f"Expected exception {exc_type.__name__}, but no exception was raised"
             )
 
+def _run_test(test_case_class, method_name, template_path):
+    """Запускает один тест (setUp, метод, tearDown); возвращает traceback или None."""
+    test_instance = test_case_class()
+    # Путь к шаблону передаётся явно: при spawn/forkserver воркер заново импортирует
+    # модуль, и вычисленный в родителе путь (с его pid) ему недоступен
+    test_instance.template_path = template_path
+    try:
+        test_instance.setUp()
+    except Exception:
+        return traceback.format_exc()
+
+    failure = None
+    try:
+        getattr(test_instance, method_name)()
+    except Exception:
+        failure = traceback.format_exc()
+    try:
+        test_instance.tearDown()
+    except Exception:
+        failure = failure or traceback.format_exc()
+    return failure
+
+
 class TestRunner:
     """Находит и запускает все тесты."""
     def __init__(self):
-        self.console = Console()
         self.tests_run = 0
         self.failures = []
+        self._pending = []
 
     def run(self, test_case_class):
-        self.console.print(f"[bold yellow]Running tests for {test_case_class.__name__}[/bold yellow]")
-        test_instance = test_case_class()
-        
-        test_methods = [m for m in dir(test_instance) if m.startswith("test_")]
-
-        for method_name in test_methods:
+        sys.stdout.write(f"{_YELLOW}Running tests for {test_case_class.__name__}{_RESET}\n")
+        sys.stdout.flush()
+
+        test_methods = test_case_class._test_methods
+
+        test_case_class.setUpClass()
+        # Тесты изолированы (у каждого процесса свой образ), поэтому идут параллельно;
+        # результаты выводим в порядке запуска
+        count = len(test_methods)
+        results = self.executor.map(
+            _run_test, [test_case_class] * count, test_methods, [test_case_class.template_path] * count
+        )
+        for method_name, failure in zip(test_methods, results):
             self.tests_run += 1
-            # Запускаем setUp, тест и tearDown для каждого метода
-            try:
-                test_instance.setUp()
-                getattr(test_instance, method_name)()
-                self.console.print(f"  [green]✓[/green] {method_name}")
-            except Exception:
-                import traceback
-                self.failures.append((method_name, traceback.format_exc()))
-                self.console.print(f"  [bold red]✗ FAILED[/bold red]: {method_name}")
-                # self.console.print(f"[red]{traceback.format_exc()}[/red]") # Можно раскомментировать для детального вывода
-            finally:
-                test_instance.tearDown()
-        
-        self.console.print("-" * 40)
+            if failure is None:
+                self._pending.append(f"  {_GREEN}✓{_RESET} {method_name}")
+            else:
+                self.failures.append((method_name, failure))
+                self._pending.append(f"  {_BOLD_RED}✗ FAILED{_RESET}: {method_name}")
+                # self._pending.append(failure) # Можно раскомментировать для детального вывода
+        test_case_class.tearDownClass()
+
+        # Результаты класса выводим одной записью
+        self._pending.append("-" * 40 + "\n")
+        sys.stdout.write("\n".join(self._pending))
+        sys.stdout.flush()
+        self._pending.clear()
+
+    @cached_property
+    def executor(self):
+        """Один пул процессов на весь прогон; закрывается в summary()."""
+        return ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+
+    @cached_property
+    def console(self):
+        """Rich нужен только для итогов: импортируем и настраиваем его при первом обращении."""
+        from rich.console import Console
+        return Console()
 
     def summary(self):
+        if "executor" in self.__dict__:
+            self.executor.shutdown()
+            del self.executor
         self.console.print("\n[bold]Test Summary[/bold]")
         if self.failures:
             self.console.print(f"[bold red]FAILURES ({len(self.failures)}):[/bold red]")
@@ -178,6 +337,105 @@ class TestCoreFS(TestCase):
         self.assertTrue("file_to_delete.txt" not in contents_after)
         self.assertRaises(FileNotFoundError, fsapi.stat, "/file_to_delete.txt")
 
+    def test_rename_file(self):
+        fd = fsapi.openf("/old.txt", fsapi.O_CREAT | fsapi.O_WRONLY)
+        fsapi.write(fd, b"rename me")
+        fsapi.close(fd)
+        old_stat = fsapi.stat("/old.txt")
+        free_blocks = self.fs.superblock.free_blocks_count
+
+        fsapi.rename("/old.txt", "/new.txt")
+        self.assertEqual(fsapi.readdir("/"), ["new.txt"])
+        self.assertEqual(fsapi.stat("/new.txt")["inode"], old_stat["inode"])
+        self.assertEqual(self.fs.superblock.free_blocks_count, free_blocks, "Rename must not copy data")
+
+        # Перемещение в другой каталог поверх существующего файла
+        fsapi.mkdir("/dir")
+        fd = fsapi.openf("/dir/target.txt", fsapi.O_CREAT | fsapi.O_WRONLY)
+        fsapi.write(fd, b"old target")
+        fsapi.close(fd)
+        fsapi.rename("/new.txt", "/dir/target.txt")
+        self.assertEqual(fsapi.readdir("/"), ["dir"])
+        self.assertEqual(fsapi.readdir("/dir"), ["target.txt"])
+
+        fd = fsapi.openf("/dir/target.txt", fsapi.O_RDONLY)
+        self.assertEqual(fsapi.read(fd, 100), b"rename me")
+        fsapi.close(fd)
+        self.assertRaises(FileNotFoundError, fsapi.rename, "/new.txt", "/other.txt")
+
+    def test_rename_directory(self):
+        fsapi.mkdirs("/a/sub")
+        fsapi.write_file("/a/sub/f.txt", b"inside")
+        fsapi.mkdir("/b")
+        sub_inode = fsapi.stat("/a/sub")["inode"]
+        a_links = fsapi.stat("/a")["links_count"]
+        b_links = fsapi.stat("/b")["links_count"]
+
+        # Перенос в другой каталог: ".." и счётчики ссылок обоих родителей
+        fsapi.rename("/a/sub", "/b/moved")
+        self.assertEqual(fsapi.readdir("/a"), [])
+        self.assertEqual(fsapi.stat("/b/moved")["inode"], sub_inode)
+        self.assertEqual(fsapi.stat("/b/moved/..")["inode"], fsapi.stat("/b")["inode"])
+        self.assertEqual(fsapi.stat("/a")["links_count"], a_links - 1)
+        self.assertEqual(fsapi.stat("/b")["links_count"], b_links + 1)
+        self.assertEqual(fsapi.read_file("/b/moved/f.txt"), b"inside")
+
+        # Пустой каталог назначения заменяется, непустой и файл - нет
+        fsapi.mkdir("/empty")
+        fsapi.rename("/b/moved", "/empty")
+        self.assertEqual(fsapi.stat("/empty")["inode"], sub_inode)
+        self.assertSetEqual(fsapi.readdir("/"), {"a", "b", "empty"})
+        self.assertRaises(OSError, fsapi.rename, "/a", "/empty")
+        self.assertRaises(NotADirectoryError, fsapi.rename, "/b", "/empty/f.txt")
+        self.assertRaises(IsADirectoryError, fsapi.rename, "/empty/f.txt", "/b")
+
+        # Записи "." и ".." не переименовываются ни как источник, ни как цель
+        for src, dst in (("/empty/.", "/zz"), ("/b/..", "/q"), ("/b", "/empty/.."), ("/b", "/empty/.")):
+            self.assertRaises(OSError, fsapi.rename, src, dst)
+        self.assertSetEqual(fsapi.readdir("/"), {"a", "b", "empty"})
+        self.assertEqual(fsapi.stat("/empty/.")["inode"], sub_inode)
+        self.assertEqual(fsapi.stat("/b/..")["inode"], fsapi.stat("/")["inode"])
+
+        # Нельзя перенести каталог внутрь самого себя
+        self.assertRaises(OSError, fsapi.rename, "/empty", "/empty/inner")
+        self.assertEqual(fsapi.stat("/empty")["inode"], sub_inode)
+
+    def test_read_file_write_file(self):
+        """Тест read_file/write_file без явных дескрипторов."""
+        self.assertEqual(fsapi.write_file("/whole.txt", b"hello world"), 11)
+        self.assertEqual(fsapi.read_file("/whole.txt"), b"hello world")
+        self.assertEqual(fsapi.read_file("/whole.txt", max_bytes=5), b"hello")
+
+        # Без усечения перезаписывается только начало файла
+        fsapi.write_file("/whole.txt", b"HELLO", truncate=False)
+        self.assertTrue(fsapi.read_file("/whole.txt") == b"HELLO world")
+        fsapi.write_file("/whole.txt", b"bye")
+        self.assertEqual(fsapi.read_file("/whole.txt"), b"bye")
+
+        fsapi.mkdir("/whole_dir")
+        with self.assertRaises(OSError):
+            fsapi.read_file("/whole_dir")
+
+    def test_path_lookup_after_namespace_changes(self):
+        """Кэш записей каталогов не должен возвращать устаревшие иноды."""
+        fsapi.mkdir("/d")
+        fd = fsapi.openf("/d/x", fsapi.O_CREAT | fsapi.O_WRONLY)
+        fsapi.close(fd)
+        self.assertEqual(fsapi.stat("/d/x")["type"], fsapi.S_IFREG)
+
+        fsapi.unlink("/d/x")
+        self.assertRaises(FileNotFoundError, fsapi.stat, "/d/x")
+
+        fsapi.mkdir("/d/x")
+        self.assertEqual(fsapi.stat("/d/x")["type"], fsapi.S_IFDIR)
+
+        # Каталог освобождён, его инод переиспользован новым каталогом
+        fsapi.rmdir("/d/x")
+        fsapi.rmdir("/d")
+        fsapi.mkdir("/e")
+        self.assertEqual(fsapi.readdir("/e"), [])
+        self.assertRaises(FileNotFoundError, fsapi.stat, "/e/x")
+
 
 class TestAdvancedFS(TestCase):
     """Тесты продвинутых сценариев: большие файлы, смещения, пограничные случаи."""
@@ -217,40 +475,47 @@ class TestAdvancedFS(TestCase):
         self.assertEqual(content, b"short\x00\x00\x00\x00\x00end")
         
     def test_large_file_multiple_blocks(self):
-        large_data = b"A" * (fsapi.BLOCK_SIZE + 500)
-        fd = fsapi.openf("/large.txt", fsapi.O_CREAT | fsapi.O_WRONLY)
-        fsapi.write(fd, large_data)
-        fsapi.close(fd)
-        
+        large_data = LARGE_DATA
+        read_data = self._write_then_read("/large.txt", large_data)
+
         file_stat = fsapi.stat("/large.txt")
         self.assertEqual(file_stat["size"], len(large_data))
-        
-        fd = fsapi.openf("/large.txt", fsapi.O_RDONLY)
-        read_data = fsapi.read(fd, len(large_data) + 100)
-        fsapi.close(fd)
-        
-        self.assertEqual(read_data, large_data)
+        self.assertTrue(read_data == large_data, "Multi-block content mismatch")
 
     def test_file_growth_beyond_inode_extents(self):
         """Проверяет, что файл может успешно вырасти до 4 и более экстентов."""
         fd = fsapi.openf("/growth.txt", fsapi.O_CREAT | fsapi.O_RDWR)
+        block_size = fsapi.BLOCK_SIZE
         
         # В цикле записываем по одному байту в разные блоки, чтобы создать много экстентов
         for i in range(10):  # Создаем 10 экстентов
-            offset = i * fsapi.BLOCK_SIZE * 2
+            offset = i * block_size * 2
             fsapi.write(fd, bytes([65 + i]), offset=offset)  # 'A' + i
         
         # Проверяем, что все записи прошли без ошибок
-        # Читаем весь файл
-        file_size = fsapi.stat("/growth.txt")["size"]
+        # Читаем весь файл: его размер известен из цикла, stat не нужен
+        file_size = 9 * block_size * 2 + 1
         data = fsapi.read(fd, file_size)
+        self.assertEqual(len(data), file_size)
         
-        # Проверяем, что данные на месте
-        for i in range(10):
-            expected_byte = 65 + i
-            self.assertEqual(data[i * fsapi.BLOCK_SIZE * 2], expected_byte, f"Byte at extent {i} is incorrect")
+        # Проверяем, что данные на месте: каждый байт-маркер берём срезом с шагом в два блока
+        self.assertEqual(data[::block_size * 2], bytes(range(65, 75)), "Extent markers are incorrect")
         
         fsapi.close(fd)
+
+    def test_file_growth_single_write(self):
+        """Тот же рисунок байтов, записанный одним вызовом: блоки выделяются пачкой."""
+        stride = fsapi.BLOCK_SIZE * 2
+        buf = bytearray(10 * stride)
+        for i in range(10):
+            buf[i * stride] = 65 + i
+
+        fd = fsapi.openf("/growth_batch.txt", fsapi.O_CREAT | fsapi.O_RDWR)
+        self.assertEqual(fsapi.write(fd, buf, offset=0), len(buf))
+
+        data = fsapi.read(fd, len(buf), offset=0)
+        self.assertTrue(data == bytes(buf), "Batched write content mismatch")
+        fsapi.close(fd)
         
     def test_unlink_open_file(self):
         """Проверяет логику отложенного удаления inode."""
@@ -318,14 +583,15 @@ class TestNamingAndPaths(TestCase):
             "__underscores__"
         ]
         fsapi.mkdir("/special_names")
-        for name in filenames:
-            path = f"/special_names/{name}"
+        # Пути и содержимое готовим до цикла с вызовами fsapi
+        prepared = [(f"/special_names/{name}", name.encode()) for name in filenames]
+        for path, encoded in prepared:
             fd = fsapi.openf(path, fsapi.O_CREAT | fsapi.O_WRONLY)
-            fsapi.write(fd, name.encode())
+            fsapi.write(fd, encoded)
             fsapi.close(fd)
         
         contents = fsapi.readdir("/special_names")
-        self.assertEqual(sorted(contents), sorted(filenames))
+        self.assertSetEqual(contents, filenames)
         
         # Проверяем чтение
         path = "/special_names/file with spaces.txt"
@@ -335,10 +601,8 @@ class TestNamingAndPaths(TestCase):
         self.assertEqual(data.decode(), "file with spaces.txt")
 
     def test_deeply_nested_directories(self):
-        path = ""
-        for i in range(10):
-            path += f"/dir{i}"
-            fsapi.mkdir(path)
+        path = "".join(f"/dir{i}" for i in range(10))
+        fsapi.mkdirs(path)
 
         file_path = path + "/final.txt"
         fd = fsapi.openf(file_path, fsapi.O_CREAT | fsapi.O_WRONLY)
@@ -349,6 +613,19 @@ class TestNamingAndPaths(TestCase):
         self.assertEqual(file_stat["size"], 4)
 
 
+    def test_mkdirs_existing_parents_and_conflicts(self):
+        fsapi.mkdir("/p")
+        fsapi.write_file("/p/file", b"x")
+        fsapi.mkdirs("/p/q/./r/../r/s")
+        self.assertEqual(fsapi.stat("/p/q/r/s")["type"], fsapi.S_IFDIR)
+        self.assertEqual(fsapi.stat("/p/q")["links_count"], 3)
+        # Повторный вызов для существующего пути ничего не меняет
+        fsapi.mkdirs("/p/q/r/s")
+        self.assertSetEqual(fsapi.readdir("/p"), ["file", "q"])
+        # Файл на пути - ошибка, как у mkdir -p
+        self.assertRaises(OSError, fsapi.mkdirs, "/p/file/sub")
+        self.assertRaises(OSError, fsapi.mkdirs, "/p/file")
+
 class TestResourceManagement(TestCase):
     """Тесты на управление ресурсами."""
 
@@ -416,15 +693,14 @@ class TestDataIntegrity(TestCase):
         fsapi.write(fd, overwrite_data, offset=offset)
         fsapi.close(fd)
         
-        # Создаем ожидаемый результат
-        expected_data = bytearray(initial_data)
-        expected_data[offset : offset + len(overwrite_data)] = overwrite_data
+        # Создаем ожидаемый результат одной склейкой bytes
+        expected_data = initial_data[:offset] + overwrite_data + initial_data[offset + len(overwrite_data):]
         
         fd = fsapi.openf("/boundary.txt", fsapi.O_RDONLY)
         read_data = fsapi.read(fd, len(expected_data) + 100)
         fsapi.close(fd)
         
-        self.assertEqual(read_data, bytes(expected_data))
+        self.assertEqual(read_data, expected_data)
 
     def test_read_with_various_offsets_and_sizes(self):
         # Создаем файл с дырой
@@ -436,11 +712,12 @@ class TestDataIntegrity(TestCase):
         expected_content = b"begin" + b'\x00' * 95 + b"end"
         
         fd = fsapi.openf("/hole.txt", fsapi.O_RDONLY)
-        # Читаем по одному байту
-        for i in range(len(expected_content)):
-            byte_read = fsapi.read(fd, 1, offset=i)
-            self.assertEqual(byte_read[0], expected_content[i], f"Byte at offset {i} is wrong")
-            
+        # Читаем файл целиком одним вызовом и сверяем побайтно уже в памяти
+        full = fsapi.read(fd, len(expected_content), offset=0)
+        self.assertEqual(len(full), len(expected_content))
+        for i, byte in enumerate(full):
+            self.assertEqual(byte, expected_content[i], f"Byte at offset {i} is wrong")
+
         # Читаем кусок, пересекающий дыру
         chunk = fsapi.read(fd, 10, offset=2)
         self.assertEqual(chunk, expected_content[2:12])
@@ -487,12 +764,11 @@ class TestDataIntegrity(TestCase):
         # Проверяем корректность после частичной перезаписи
         full_read = fsapi.read(fd, len(large_data), offset=0)
         
-        # Создаем ожидаемый результат
-        expected = bytearray(large_data)
+        # Создаем ожидаемый результат одной склейкой bytes
         start_offset = fsapi.BLOCK_SIZE - 50
-        expected[start_offset:start_offset + len(partial_data)] = partial_data
+        expected = large_data[:start_offset] + partial_data + large_data[start_offset + len(partial_data):]
         
-        self.assertEqual(full_read, bytes(expected))
+        self.assertEqual(full_read, expected)
         
         fsapi.close(fd)
 
@@ -511,26 +787,156 @@ class TestDirectoryOperations(TestCase):
         
         # Создаем много файлов в одном каталоге
         num_files = 100
-        for i in range(num_files):
-            filename = f"/many_entries/file_{i:03d}.txt"
-            fd = fsapi.openf(filename, fsapi.O_CREAT | fsapi.O_WRONLY)
-            fsapi.write(fd, f"content_{i}".encode())
-            fsapi.close(fd)
+        fsapi.create_many(
+            "/many_entries", [(f"file_{i:03d}.txt", f"content_{i}".encode()) for i in range(num_files)]
+        )
         
-        # Проверяем, что все файлы видны
-        contents = fsapi.readdir("/many_entries")
+        # Проверяем, что все файлы видны; номера инодов берём из того же листинга
+        contents = {name: st["inode"] for name, st in fsapi.readdirplus("/many_entries")}
         self.assertEqual(len(contents), num_files)
         
-        # Проверяем несколько случайных файлов
+        # Проверяем несколько случайных файлов, открывая их по иноду без обхода пути
         for i in [0, 25, 50, 75, 99]:
-            filename = f"/many_entries/file_{i:03d}.txt"
-            self.assertTrue(f"file_{i:03d}.txt" in contents)
+            filename = f"file_{i:03d}.txt"
+            self.assertTrue(filename in contents)
             
-            fd = fsapi.openf(filename, fsapi.O_RDONLY)
+            fd = fsapi.open_inode(contents[filename], fsapi.O_RDONLY)
             content = fsapi.read(fd, 100)
             fsapi.close(fd)
             self.assertEqual(content, f"content_{i}".encode())
 
+    def test_open_inode_rejects_directories_and_free_inodes(self):
+        fsapi.mkdir("/d")
+        free_inode = fsapi.stat("/d")["inode"] + 1
+        self.assertRaises(OSError, fsapi.open_inode, fsapi.stat("/d")["inode"])
+        self.assertRaises(FileNotFoundError, fsapi.open_inode, free_inode)
+        fsapi.write_file("/gone", b"x")
+        gone_inode = fsapi.stat("/gone")["inode"]
+        fsapi.unlink("/gone")
+        self.assertRaises(FileNotFoundError, fsapi.open_inode, gone_inode)
+
+    def test_opendir_streams_entries_and_exists(self):
+        fsapi.mkdir("/stream")
+        names = [f"streamed_entry_{i:03d}_with_padding" for i in range(150)]
+        fsapi.create_many("/stream", [(name, b"") for name in names])
+
+        entries = fsapi.opendir("/stream")
+        self.assertEqual(next(entries), names[0])
+        self.assertTrue(list(entries) == names[1:])
+        self.assertRaises(OSError, fsapi.opendir, f"/stream/{names[0]}")
+
+        self.assertTrue(fsapi.exists(f"/stream/{names[-1]}"))
+        self.assertTrue(not fsapi.exists("/stream/missing"))
+        self.assertTrue(not fsapi.exists(f"/stream/{names[0]}/below_a_file"))
+
+    def test_create_many_spans_blocks_and_rejects_existing(self):
+        fsapi.mkdir("/bulk")
+        fsapi.write_file("/bulk/taken.txt", b"old")
+        free_inodes = self.fs.superblock.free_inodes_count
+
+        # Имя уже занято - ничего не выделяется
+        self.assertRaises(OSError, fsapi.create_many, "/bulk", [("new.txt", b"x"), ("taken.txt", b"y")])
+        self.assertEqual(self.fs.superblock.free_inodes_count, free_inodes)
+
+        # Записей больше, чем помещается в один блок каталога
+        names = [f"entry_with_a_long_name_{i:04d}" for i in range(200)]
+        inode_nums = fsapi.create_many("/bulk", [(name, name.encode()) for name in names])
+        self.assertEqual(len(set(inode_nums)), len(names))
+        self.assertEqual(self.fs.superblock.free_inodes_count, free_inodes - len(names))
+        self.assertSetEqual(fsapi.readdir("/bulk"), names + ["taken.txt"])
+        for name in (names[0], names[-1]):
+            self.assertEqual(fsapi.read_file(f"/bulk/{name}"), name.encode())
+
+    def test_create_many_rejects_bad_names_and_releases_inodes(self):
+        free_inodes = self.fs.superblock.free_inodes_count
+        for bad_name in ("", ".", "..", "x/y", "n" * 256):
+            self.assertRaises(OSError, fsapi.create_many, "/", [("ok.txt", b""), (bad_name, b"")])
+        self.assertEqual(self.fs.superblock.free_inodes_count, free_inodes)
+        self.assertEqual(fsapi.readdir("/"), [])
+
+        # Образ заполнен: каталог не может вырасти, непривязанные иноды возвращаются
+        fd = fsapi.openf("/fill.bin", fsapi.O_CREAT | fsapi.O_WRONLY)
+        with self.assertRaises(OSError):
+            fsapi.write(fd, b"F" * (self.fs.superblock.fs_size_blocks * fsapi.BLOCK_SIZE))
+        fsapi.close(fd)
+        free_inodes = self.fs.superblock.free_inodes_count
+        names = [f"{i:03d}_" + "n" * 200 for i in range(200)]
+        self.assertRaises(OSError, fsapi.create_many, "/", [(name, b"") for name in names])
+        linked = [name for name in fsapi.readdir("/") if name != "fill.bin"]
+        self.assertTrue(len(linked) < len(names))
+        self.assertEqual(self.fs.superblock.free_inodes_count, free_inodes - len(linked))
+        for name in linked:
+            self.assertEqual(fsapi.stat("/" + name)["size"], 0)
+
+    def test_readdirplus_matches_stat(self):
+        fsapi.mkdir("/plus")
+        fsapi.mkdir("/plus/sub")
+        fd = fsapi.openf("/plus/file.txt", fsapi.O_CREAT | fsapi.O_WRONLY)
+        fsapi.write(fd, b"payload")
+        fsapi.close(fd)
+
+        entries = dict(fsapi.readdirplus("/plus"))
+        self.assertSetEqual(fsapi.readdir("/plus"), entries)
+        for name, st in entries.items():
+            self.assertEqual(st, fsapi.lstat(f"/plus/{name}"), f"stat mismatch for {name}")
+        self.assertEqual(entries["file.txt"]["size"], 7)
+        self.assertEqual(entries["sub"]["type"], fsapi.S_IFDIR)
+
+        # Тип из записи каталога: 1 - обычный файл, 2 - каталог
+        self.assertEqual(dict(fsapi.readdir_typed("/plus")), {"file.txt": 1, "sub": 2})
+
+    def test_readdirplus_cold_cache_spans_inode_blocks(self):
+        """readdirplus читает иноды пачкой: проверяем границы блоков таблицы инодов."""
+        fsapi.mkdir("/bulk")
+        expected = {}
+        for i in range(100):
+            fd = fsapi.openf(f"/bulk/f{i}", fsapi.O_CREAT | fsapi.O_WRONLY)
+            fsapi.write(fd, b"z" * i)
+            fsapi.close(fd)
+            expected[f"f{i}"] = i
+
+        # Переоткрываем образ, чтобы иноды читались с диска, а не из кэша
+        self._remount()
+
+        sizes = {name: st["size"] for name, st in fsapi.readdirplus("/bulk")}
+        self.assertEqual(sizes, expected)
+
+    def test_inode_cache_is_bounded(self):
+        limit = fsapi.INODE_CACHE_LIMIT
+        fsapi.INODE_CACHE_LIMIT = 8
+        try:
+            inode_nums = fsapi.create_many("/", [(f"c{i}", b"%d" % i) for i in range(20)])
+            self.assertTrue(len(self.fs._inode_cache) <= 8)
+            # Вытесненные иноды перечитываются с диска, пачка больше лимита отдаётся целиком
+            inodes = self.fs._get_inodes_bulk(inode_nums)
+            self.assertEqual([inode.size_lo for inode in inodes], [len(b"%d" % i) for i in range(20)])
+            self.assertTrue(len(self.fs._inode_cache) <= 8)
+            self.assertEqual(fsapi.read_file("/c0"), b"0")
+        finally:
+            fsapi.INODE_CACHE_LIMIT = limit
+
+    def test_dentry_cache_follows_directory_changes(self):
+        """Промах загружает каталог в кэш целиком: создание, rename и unlink должны его обновлять."""
+        fsapi.mkdir("/cache")
+        self.assertRaises(FileNotFoundError, fsapi.stat, "/cache/a")
+        fsapi.write_file("/cache/a", b"1")
+        fsapi.rename("/cache/a", "/cache/b")
+        self.assertRaises(FileNotFoundError, fsapi.stat, "/cache/a")
+        self.assertEqual(fsapi.read_file("/cache/b"), b"1")
+
+        names = [f"entry_{i:03d}_padding_padding" for i in range(300)]
+        fsapi.create_many("/cache", [(name, b"") for name in names])
+        dir_size = fsapi.stat("/cache")["size"]
+        fsapi.unlink(f"/cache/{names[0]}")
+        # Место освобождённой записи в первом блоке переиспользуется, каталог не растёт
+        fsapi.write_file("/cache/new", b"2")
+        self.assertEqual(fsapi.stat("/cache")["size"], dir_size)
+        self.assertRaises(FileNotFoundError, fsapi.stat, f"/cache/{names[0]}")
+
+        self._remount()
+        self.assertSetEqual(fsapi.readdir("/cache"), names[1:] + ["b", "new"])
+        self.assertEqual(fsapi.read_file("/cache/new"), b"2")
+
     def test_directory_entry_reuse_after_deletion(self):
         """Тест на переиспользование места в блоках каталога после удаления."""
         fsapi.mkdir("/reuse_test")
@@ -544,7 +950,7 @@ class TestDirectoryOperations(TestCase):
         
         # Проверяем, что все созданы
         contents = fsapi.readdir("/reuse_test")
-        self.assertEqual(sorted(contents), sorted(files_to_create))
+        self.assertSetEqual(contents, files_to_create)
         
         # Удаляем средние файлы
         fsapi.unlink("/reuse_test/b.txt")
@@ -553,7 +959,7 @@ class TestDirectoryOperations(TestCase):
         # Проверяем, что остались правильные файлы
         contents_after_delete = fsapi.readdir("/reuse_test")
         expected_remaining = ["a.txt", "c.txt", "e.txt"]
-        self.assertEqual(sorted(contents_after_delete), sorted(expected_remaining))
+        self.assertSetEqual(contents_after_delete, expected_remaining)
         
         # Создаем новые файлы (должны переиспользовать освободившееся место)
         new_files = ["f.txt", "g.txt"]
@@ -565,7 +971,7 @@ class TestDirectoryOperations(TestCase):
         # Проверяем финальное состояние
         final_contents = fsapi.readdir("/reuse_test")
         expected_final = ["a.txt", "c.txt", "e.txt", "f.txt", "g.txt"]
-        self.assertEqual(sorted(final_contents), sorted(expected_final))
+        self.assertSetEqual(final_contents, expected_final)
 
 
 class TestExtentTreeStress(TestCase):
@@ -579,27 +985,106 @@ class TestExtentTreeStress(TestCase):
         pattern = b'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
         block_size = fsapi.BLOCK_SIZE
         
-        for i, byte_val in enumerate(pattern):
-            # Записываем в блоки с большими промежутками
-            offset = i * block_size * 3  # 3 блока между записями
-            fsapi.write(fd, bytes([byte_val]), offset=offset)
-        
+        # Записываем в блоки с большими промежутками (3 блока между записями) одним вызовом
+        written = fsapi.pwrite_many(fd, [(i * block_size * 3, bytes([b])) for i, b in enumerate(pattern)])
+        self.assertEqual(written, len(pattern))
+
         # Проверяем, что можем прочитать все обратно
+        expected_size = (len(pattern) - 1) * block_size * 3 + 1
+        content = fsapi.read(fd, expected_size, offset=0)
         for i, expected_byte in enumerate(pattern):
-            offset = i * block_size * 3
-            actual = fsapi.read(fd, 1, offset=offset)
-            self.assertEqual(actual[0], expected_byte)
+            self.assertEqual(content[i * block_size * 3], expected_byte)
         
         # Проверяем размер файла
         file_stat = fsapi.stat("/fragmented.txt")
-        expected_size = (len(pattern) - 1) * block_size * 3 + 1
         self.assertEqual(file_stat["size"], expected_size)
         
         fsapi.close(fd)
 
+    def test_pwrite_many_pieces_share_blocks(self):
+        """Несколько кусков в одном блоке и кусок через границу блоков."""
+        block_size = fsapi.BLOCK_SIZE
+        fd = fsapi.openf("/pieces.bin", fsapi.O_CREAT | fsapi.O_RDWR)
+        fsapi.write(fd, b"." * (2 * block_size), offset=0)
+
+        pieces = [(block_size - 2, b"XXXX"), (5, b"b"), (0, b"a"), (3 * block_size, b"tail")]
+        self.assertEqual(fsapi.pwrite_many(fd, pieces), 10)
+
+        expected = bytearray(b"." * (2 * block_size) + b"\x00" * block_size + b"tail")
+        for offset, data in pieces:
+            expected[offset:offset + len(data)] = data
+        self.assertTrue(fsapi.read(fd, len(expected) + 10, offset=0) == bytes(expected))
+        # Позиция дескриптора не меняется, как у pwrite
+        self.assertEqual(fsapi.read(fd, 1), b"a")
+        fsapi.close(fd)
+
+    def test_fallocate_fills_holes_and_keeps_data(self):
+        block_size = fsapi.BLOCK_SIZE
+        fd = fsapi.openf("/prealloc.bin", fsapi.O_CREAT | fsapi.O_RDWR)
+        fsapi.write(fd, b"head", offset=0)
+        fsapi.write(fd, b"mid", offset=2 * block_size)
+        free_blocks = self.fs.superblock.free_blocks_count
+
+        # Дыры: блок 1 и блоки 3-4; возвращаются байты дыр до length, хотя выделено три целых блока
+        self.assertEqual(fsapi.fallocate(fd, 4 * block_size + 100), 2 * block_size + 100)
+        # Три блока данных (плюс, возможно, узел дерева экстентов)
+        free_after = self.fs.superblock.free_blocks_count
+        self.assertTrue(free_blocks - free_after >= 3)
+        self.assertEqual(fsapi.stat("/prealloc.bin")["size"], 4 * block_size + 100)
+
+        expected = bytearray(4 * block_size + 100)
+        expected[0:4] = b"head"
+        expected[2 * block_size:2 * block_size + 3] = b"mid"
+        self.assertTrue(fsapi.read(fd, len(expected) + 10, offset=0) == bytes(expected))
+
+        # Всё уже выделено: размер только растёт до length, новых блоков нет
+        self.assertEqual(fsapi.fallocate(fd, 4 * block_size + 200), 0)
+        self.assertEqual(self.fs.superblock.free_blocks_count, free_after)
+        self.assertEqual(fsapi.stat("/prealloc.bin")["size"], 4 * block_size + 200)
+        fsapi.close(fd)
+
+    def test_unlink_many_frees_blocks_and_inodes(self):
+        block_size = fsapi.BLOCK_SIZE
+        free_blocks = self.fs.superblock.free_blocks_count
+        free_inodes = self.fs.superblock.free_inodes_count
+        fsapi.mkdir("/bulk")
+        fsapi.create_many("/", [(f"r{i}", b"r" * (i * block_size + 1)) for i in range(5)])
+        fsapi.create_many("/bulk", [(f"b{i}", b"b" * 10) for i in range(5)])
+        paths = [f"/r{i}" for i in range(5)] + [f"/bulk/b{i}" for i in range(5)]
+
+        # Отсутствующий путь: ничего не удаляется
+        with self.assertRaises(FileNotFoundError):
+            fsapi.unlink_many(paths + ["/bulk/missing"])
+        self.assertTrue(all(fsapi.exists(path) for path in paths))
+
+        # Открытый файл освобождается только после close
+        fd = fsapi.openf("/r4", fsapi.O_RDONLY)
+        fsapi.unlink_many(paths)
+        self.assertTrue(not any(fsapi.exists(path) for path in paths))
+        self.assertSetEqual(fsapi.readdir("/bulk"), set())
+        self.assertTrue(fsapi.read(fd, 10) == b"r" * 10)
+        fsapi.close(fd)
+
+        fsapi.rmdir("/bulk")
+        self.assertEqual(self.fs.superblock.free_blocks_count, free_blocks)
+        self.assertEqual(self.fs.superblock.free_inodes_count, free_inodes)
+
+    def test_buffered_writer_coalesces_writes(self):
+        fd = fsapi.openf("/buffered.txt", fsapi.O_CREAT | fsapi.O_RDWR)
+        with fsapi.BufferedWriter(fd, bufsize=64) as writer:
+            for i in range(100):
+                writer.write(b"%03d" % i)
+            # Переход на несмежное смещение сбрасывает накопленное
+            writer.write(b"XY", offset=1000)
+            writer.write(b"Z", offset=1002)
+        expected = b"".join(b"%03d" % i for i in range(100))
+        self.assertTrue(fsapi.read(fd, 2000, offset=0) == b"".join((expected, ZEROS[:700], b"XYZ")))
+        fsapi.close(fd)
+
     def test_extent_tree_split_and_merge(self):
         """Тестирует разделение и слияние узлов в B+ дереве."""
         fd = fsapi.openf("/tree_test.txt", fsapi.O_CREAT | fsapi.O_RDWR)
+        block_size = fsapi.BLOCK_SIZE
         
         # Создаем достаточно экстентов, чтобы превысить емкость root узла
         # Обычно это 3-4 экстента в root inode
@@ -608,30 +1093,30 @@ class TestExtentTreeStress(TestCase):
         
         for i in range(num_extents):
             # Создаем экстенты с промежутками
-            offset = i * fsapi.BLOCK_SIZE * 2  # Промежуток в 1 блок между экстентами
+            offset = i * block_size * 2  # Промежуток в 1 блок между экстентами
             fsapi.write(fd, data_pattern, offset=offset)
         
         # Проверяем, что дерево корректно обрабатывает много экстентов
         for i in range(num_extents):
-            offset = i * fsapi.BLOCK_SIZE * 2
+            offset = i * block_size * 2
             read_data = fsapi.read(fd, len(data_pattern), offset=offset)
             self.assertEqual(read_data, data_pattern)
         
         # Заполняем промежутки, создавая возможность для слияния экстентов
-        gap_data = b"Y" * fsapi.BLOCK_SIZE
+        gap_data = b"Y" * block_size
         for i in range(num_extents - 1):
-            gap_offset = i * fsapi.BLOCK_SIZE * 2 + fsapi.BLOCK_SIZE
+            gap_offset = i * block_size * 2 + block_size
             fsapi.write(fd, gap_data, offset=gap_offset)
         
         # Проверяем целостность после заполнения промежутков
         for i in range(num_extents - 1):
             # Проверяем оригинальные данные
-            offset = i * fsapi.BLOCK_SIZE * 2
+            offset = i * block_size * 2
             read_data = fsapi.read(fd, len(data_pattern), offset=offset)
             self.assertEqual(read_data, data_pattern)
             
             # Проверяем данные в промежутках
-            gap_offset = i * fsapi.BLOCK_SIZE * 2 + fsapi.BLOCK_SIZE
+            gap_offset = i * block_size * 2 + block_size
             gap_read = fsapi.read(fd, len(gap_data), offset=gap_offset)
             self.assertEqual(gap_read, gap_data)
         
@@ -714,13 +1199,9 @@ class TestMultipleDescriptorsAccess(TestCase):
             offset = i * 10
             fsapi.write(fd_write, chunk, offset=offset)
             
-            # После каждой записи проверяем, что читающий дескриптор видит изменения
-            current_content = fsapi.read(fd_read, offset + len(chunk), offset=0)
-            
-            # Проверяем, что новые данные видны
-            chunk_start = offset
-            chunk_end = offset + len(chunk)
-            actual_chunk = current_content[chunk_start:chunk_end]
+            # После каждой записи проверяем, что читающий дескриптор видит изменения:
+            # читаем только новый кусок, уже проверенное начало не перечитываем
+            actual_chunk = fsapi.read(fd_read, len(chunk), offset=offset)
             self.assertEqual(actual_chunk, chunk)
         
         fsapi.close(fd_write)
@@ -757,22 +1238,13 @@ class TestPerformanceAndLimits(TestCase):
     def test_deep_directory_nesting(self):
         """Тест глубокой вложенности каталогов."""
         max_depth = 50
-        path = ""
+        path = "".join(f"/level{i}" for i in range(max_depth))
         
-        # Создаем глубокую иерархию
-        for i in range(max_depth):
-            path += f"/level{i}"
-            try:
-                fsapi.mkdir(path)
-            except OSError:
-                # Если достигли лимита, останавливаемся
-                max_depth = i
-                break
+        # Создаем глубокую иерархию одним проходом от корня (лимита глубины у ФС нет)
+        fsapi.mkdirs(path)
         
         # Проверяем, что можем создать файл на максимальной глубине
         if max_depth > 0:
-            # Восстанавливаем path до последнего успешно созданного уровня
-            path = "/".join(f"/level{i}" for i in range(max_depth))
             file_path = f"{path}/deep_file.txt"
             
             try:
@@ -794,41 +1266,27 @@ class TestPerformanceAndLimits(TestCase):
         """Стресс-тест создания и удаления множества файлов."""
         num_files = 50  # Ограничиваем, чтобы не исчерпать inodes
         
-        # Создаем много файлов
-        created_files = []
-        for i in range(num_files):
-            try:
-                filename = f"/stress_{i:03d}.txt"
-                fd = fsapi.openf(filename, fsapi.O_CREAT | fsapi.O_WRONLY)
-                fsapi.write(fd, f"stress test {i}".encode())
-                fsapi.close(fd)
-                created_files.append(filename)
-            except OSError as e:
-                if "No free" in str(e):
-                    # Закончились ресурсы
-                    break
-                raise
+        # Создаем много файлов одним вызовом: каталог обходится один раз
+        fsapi.create_many("/", [(f"stress_{i:03d}.txt", f"stress test {i}".encode()) for i in range(num_files)])
+        created_files = [f"/stress_{i:03d}.txt" for i in range(num_files)]
         
         # Проверяем, что все созданные файлы видны
-        root_contents = fsapi.readdir("/")
+        root_contents = set(fsapi.readdir("/"))
         for filename in created_files:
             basename = filename[1:]  # убираем ведущий /
             self.assertTrue(basename in root_contents)
         
-        # Удаляем все файлы
-        for filename in created_files:
-            fsapi.unlink(filename)
+        # Удаляем все файлы одним вызовом
+        fsapi.unlink_many(created_files)
         
         # Проверяем, что все удалены
-        root_contents_after = fsapi.readdir("/")
         for filename in created_files:
-            basename = filename[1:]
-            self.assertTrue(basename not in root_contents_after)
+            self.assertTrue(not fsapi.exists(filename))
+        self.assertTrue(not any(name.startswith("stress_") for name in fsapi.opendir("/")))
 
     def test_filesystem_space_exhaustion(self):
         """Тест исчерпания места на диске."""
         block_size = fsapi.BLOCK_SIZE
-        large_chunk = b"X" * block_size
         
         files_created = []
         try:
@@ -837,11 +1295,11 @@ class TestPerformanceAndLimits(TestCase):
                 filename = f"/space_test_{i}.txt"
                 fd = fsapi.openf(filename, fsapi.O_CREAT | fsapi.O_WRONLY)
                 
-                # Записываем несколько блоков в каждый файл
-                for j in range(5):
-                    fsapi.write(fd, large_chunk)
-                
-                fsapi.close(fd)
+                # Выделяем несколько блоков каждому файлу одним вызовом
+                try:
+                    fsapi.fallocate(fd, 5 * block_size)
+                finally:
+                    fsapi.close(fd)
                 files_created.append(filename)
                 
         except OSError as e:
@@ -852,11 +1310,26 @@ class TestPerformanceAndLimits(TestCase):
         self.assertTrue(len(files_created) > 0)
         
         # Освобождаем место
-        for filename in files_created:
-            try:
-                fsapi.unlink(filename)
-            except:
-                pass
+        fsapi.unlink_many(files_created)
+
+    def test_single_file_fills_image(self):
+        """Тест заполнения всего образа одним файлом: ошибка места, а не порча счётчиков."""
+        block_size = fsapi.BLOCK_SIZE
+        free_before = self.fs.superblock.free_blocks_count
+
+        fd = fsapi.openf("/fill.bin", fsapi.O_CREAT | fsapi.O_WRONLY)
+        with self.assertRaises(OSError):
+            fsapi.write(fd, b"F" * (self.fs.superblock.fs_size_blocks * block_size))
+        fsapi.close(fd)
+        self.assertEqual(self.fs.superblock.free_blocks_count, 0)
+
+        # Записанная часть сохранена в inode
+        data = fsapi.read_file("/fill.bin")
+        self.assertTrue(len(data) > 0 and data == b"F" * len(data), "Partial write content mismatch")
+
+        # После удаления все блоки возвращаются
+        fsapi.unlink("/fill.bin")
+        self.assertEqual(self.fs.superblock.free_blocks_count, free_before)
 
     def test_zero_byte_operations(self):
         """Тест операций с нулевыми размерами."""
@@ -990,7 +1463,7 @@ class TestSpecialCases(TestCase):
         fsapi.close(fd2)
         
         # Должны быть разные файлы
-        contents = fsapi.readdir("/")
+        contents = set(fsapi.readdir("/"))
         self.assertTrue("CaseSensitive.txt" in contents)
         self.assertTrue("casesensitive.txt" in contents)
         
@@ -1019,10 +1492,9 @@ class TestSpecialCases(TestCase):
         created_files = []
         for name in unicode_names:
             try:
-                path = f"/{name}"
-                fd = fsapi.openf(path, fsapi.O_CREAT | fsapi.O_WRONLY)
-                fsapi.write(fd, name.encode('utf-8'))
-                fsapi.close(fd)
+                # Сразу проверяем чтение через тот же дескриптор
+                content = self._write_then_read(f"/{name}", name.encode('utf-8'))
+                self.assertEqual(content.decode('utf-8'), name)
                 created_files.append(name)
             except (OSError, UnicodeError):
                 # Некоторые символы могут не поддерживаться
@@ -1030,15 +1502,9 @@ class TestSpecialCases(TestCase):
         
         # Проверяем созданные файлы
         if created_files:
-            contents = fsapi.readdir("/")
+            contents = set(fsapi.readdir("/"))
             for name in created_files:
                 self.assertTrue(name in contents)
-                
-                # Проверяем чтение
-                fd = fsapi.openf(f"/{name}", fsapi.O_RDONLY)
-                content = fsapi.read(fd, 100)
-                fsapi.close(fd)
-                self.assertEqual(content.decode('utf-8'), name)
 
 
 class TestAtomicOperations(TestCase):
@@ -1096,16 +1562,16 @@ class TestBoundaryConditions(TestCase):
         fd = fsapi.openf("/boundary.txt", fsapi.O_CREAT | fsapi.O_RDWR)
         
         # Записываем данные, пересекающие границу блока
-        data_before = b"A" * (block_size - 10)
+        data_before = FILLER_A[:block_size - 10]
         data_after = b"B" * 20
-        combined_data = data_before + data_after
+        combined_data = b"".join((data_before, data_after))
         
         fsapi.write(fd, combined_data)
         
         # Читаем по частям
         # Читаем до границы блока
         part1 = fsapi.read(fd, block_size - 10, offset=0)
-        self.assertEqual(part1, data_before)
+        self.assertTrue(part1 == data_before)
         
         # Читаем через границу блока
         part2 = fsapi.read(fd, 20, offset=block_size - 10)
@@ -1117,7 +1583,48 @@ class TestBoundaryConditions(TestCase):
         
         next_byte = fsapi.read(fd, 1, offset=block_size - 10) # Это первый байт 'B' (на смещении 4086)
         self.assertEqual(next_byte, b"B")
-        
+
+        fsapi.close(fd)
+
+    def test_memoryview_full_block_overwrite(self):
+        """Тест записи из memoryview поверх существующих блоков."""
+        block_size = fsapi.BLOCK_SIZE
+
+        fd = fsapi.openf("/mv.txt", fsapi.O_CREAT | fsapi.O_RDWR)
+        fsapi.write(fd, b"x" * (3 * block_size))
+
+        # Целые блоки и хвосты частичных блоков в одном вызове
+        buf = bytearray(b"y" * (2 * block_size + 20))
+        written = fsapi.write(fd, memoryview(buf), offset=block_size - 10)
+        self.assertEqual(written, len(buf))
+
+        content = fsapi.read(fd, 4 * block_size, offset=0)
+        expected = b"x" * (block_size - 10) + bytes(buf)
+        self.assertEqual(len(content), len(expected))
+        self.assertTrue(content == expected, "Content mismatch after memoryview write")
+        fsapi.close(fd)
+
+    def test_readinto_across_blocks_and_holes(self):
+        """Тест readinto: чтение через границы блоков и дыры в предвыделенный буфер."""
+        block_size = fsapi.BLOCK_SIZE
+
+        fd = fsapi.openf("/ri.txt", fsapi.O_CREAT | fsapi.O_RDWR)
+        fsapi.write(fd, b"a" * (block_size + 5))
+        fsapi.write(fd, b"b" * 10, offset=3 * block_size)
+
+        buf = bytearray(b"?" * (4 * block_size))
+        n = fsapi.readinto(fd, buf, offset=block_size - 5)
+        expected = fsapi.read(fd, 4 * block_size, offset=block_size - 5)
+        self.assertEqual(n, len(expected))
+        self.assertTrue(bytes(buf[:n]) == expected, "readinto differs from read")
+        self.assertTrue(buf[n:] == b"?" * (len(buf) - n), "readinto wrote past end of file")
+
+        fsapi.close(fd)
+
+        # Без явного смещения читаем с позиции дескриптора и сдвигаем её
+        fd = fsapi.openf("/ri.txt", fsapi.O_RDONLY)
+        self.assertEqual(fsapi.readinto(fd, memoryview(buf)[:8]), 8)
+        self.assertEqual(fsapi.read(fd, 2), b"aa")
         fsapi.close(fd)
 
     def test_maximum_offset_operations(self):
@@ -1154,11 +1661,12 @@ class TestBoundaryConditions(TestCase):
         sb = fsapi.get_filesystem().superblock
         max_inodes = sb.total_inodes
         
-        # Создаем файлы до исчерпания inode
+        # Создаем файлы до исчерпания inode; пути готовим заранее, вне цикла
+        paths = [f"/inode_test_{i}.txt" for i in range(max_inodes + 10)]  # Больше, чем возможно
         created_count = 0
         try:
-            for i in range(max_inodes + 10):  # Пытаемся создать больше, чем возможно
-                fd = fsapi.openf(f"/inode_test_{i}.txt", fsapi.O_CREAT)
+            for path in paths:
+                fd = fsapi.openf(path, fsapi.O_CREAT)
                 fsapi.close(fd)
                 created_count += 1
         except OSError as e:
@@ -1201,6 +1709,23 @@ class TestFileSystemIntegrity(TestCase):
         # Ресурсы должны освободиться
         self.assertEqual(free_inodes_final, free_inodes_before)
 
+    def test_growing_file_keeps_neighbour_inodes_on_disk(self):
+        """Расширение экстента в корне не должно затирать соседние иноды."""
+        for name in ("/a.txt", "/b.txt"):
+            fd = fsapi.openf(name, fsapi.O_CREAT | fsapi.O_WRONLY)
+            fsapi.write(fd, b"x")
+            fsapi.close(fd)
+        b_stat = fsapi.stat("/b.txt")
+
+        fd = fsapi.openf("/a.txt", fsapi.O_WRONLY)
+        fsapi.write(fd, b"y" * (3 * fsapi.BLOCK_SIZE))
+        fsapi.close(fd)
+
+        # Переоткрываем образ, чтобы читать иноды с диска, а не из кэша
+        self._remount()
+        self.assertEqual(fsapi.stat("/b.txt"), b_stat)
+        self.assertEqual(fsapi.stat("/a.txt")["size"], 3 * fsapi.BLOCK_SIZE)
+
     def test_bitmap_consistency(self):
         """Тест консистентности битовых карт."""
         fs = fsapi.get_filesystem()
@@ -1323,10 +1848,9 @@ class TestEdgeCasesAndCornerCases(TestCase):
         """Тест операций с разреженными файлами."""
         fd = fsapi.openf("/sparse.txt", fsapi.O_CREAT | fsapi.O_RDWR)
         
-        # Создаем разреженный файл
-        fsapi.write(fd, b"start", offset=0)
-        fsapi.write(fd, b"middle", offset=1000)
-        fsapi.write(fd, b"end", offset=2000)
+        # Создаем разреженный файл одной записью из трёх кусков
+        written = fsapi.pwrite_many(fd, [(0, b"start"), (1000, b"middle"), (2000, b"end")])
+        self.assertEqual(written, 14)
         
         # Проверяем размер
         stat_info = fsapi.stat("/sparse.txt")
@@ -1334,10 +1858,15 @@ class TestEdgeCasesAndCornerCases(TestCase):
         
         # Читаем дыры (должны содержать нули)
         hole1 = fsapi.read(fd, 10, offset=100)
-        self.assertEqual(hole1, b"\x00" * 10)
+        self.assertEqual(hole1.count(0), len(hole1))
         
         hole2 = fsapi.read(fd, 10, offset=1500)
-        self.assertEqual(hole2, b"\x00" * 10)
+        self.assertEqual(hole2.count(0), len(hole2))
+
+        # Весь промежуток между "start" и "middle" одним чтением
+        full_hole = fsapi.read(fd, 995, offset=5)
+        self.assertEqual(len(full_hole), 995)
+        self.assertEqual(full_hole.count(0), 995)
         
         # Читаем данные
         start_data = fsapi.read(fd, 5, offset=0)
@@ -1381,10 +1910,10 @@ class TestEdgeCasesAndCornerCases(TestCase):
         
         try:
             # Пытаемся открыть много файлов одновременно
-            for i in range(100):
-                filename = f"/fd_limit_{i}.txt"
+            files = [(f"/fd_limit_{i}.txt", f"file {i}".encode()) for i in range(100)]
+            for filename, data in files:
                 fd = fsapi.openf(filename, fsapi.O_CREAT | fsapi.O_RDWR)
-                fsapi.write(fd, f"file {i}".encode())
+                fsapi.write(fd, data)
                 open_fds.append(fd)
                 
         except OSError as e:
@@ -1400,7 +1929,7 @@ class TestEdgeCasesAndCornerCases(TestCase):
 
 
 if __name__ == "__main__":
-    console.print("[bold white on blue]EXT4-like Filesystem Test Suite[/bold white on blue]\n")
+    sys.stdout.write(f"{_BANNER}EXT4-like Filesystem Test Suite{_RESET}\n\n")
     
     runner = TestRunner()
     